@@ -0,0 +1,130 @@
+"""
+Messages per second through an Actor, current runtime against the previous
+one (two Tasks and asyncio.wait per message, a Task per send).
+
+    python -m benchmarks.actor_throughput [messages]
+"""
+
+import asyncio
+import gc
+import sys
+import time
+import traceback
+
+from core.actor import Actor
+
+MESSAGES = 200_000
+
+
+class LegacyActor:
+    """Actor runtime as it was before the single consumer loop."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.running = True
+        self._loop = None
+        self._stop_event = None
+
+    def set_loop(self, loop):
+        self._loop = loop
+
+    async def _send(self, message):
+        await self.queue.put(message)
+
+    def send(self, message):
+        if self._loop is None or not self.running or self._loop.is_closed():
+            return
+        try:
+            self._loop.call_soon_threadsafe(
+                lambda: asyncio.create_task(self._send(message))
+            )
+        except RuntimeError:
+            pass
+
+    async def stop(self):
+        self.running = False
+        if self._stop_event:
+            self._stop_event.set()
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        try:
+            while self.running:
+                get_task = asyncio.create_task(self.queue.get())
+                stop_task = asyncio.create_task(self._stop_event.wait())
+                done, pending = await asyncio.wait(
+                    [get_task, stop_task], return_when=asyncio.FIRST_COMPLETED
+                )
+                for t in pending:
+                    t.cancel()
+                if stop_task in done:
+                    break
+                await self.on_event(get_task.result())
+        except Exception:
+            traceback.print_exc()
+
+
+class Counter:
+    def setup(self, total: int):
+        self.count = 0
+        self.total = total
+        self.done = asyncio.Event()
+
+    async def on_event(self, message):
+        self.count += 1
+        if self.count == self.total:
+            self.done.set()
+
+
+class LegacyCounter(Counter, LegacyActor):
+    pass
+
+
+class CurrentCounter(Counter, Actor):
+    pass
+
+
+class BatchCounter(Counter, Actor):
+    async def on_events(self, messages):
+        self.count += len(messages)
+        if self.count >= self.total:
+            self.done.set()
+
+
+async def measure(actor_class, total: int) -> tuple[float, int]:
+    actor = actor_class()
+    actor.setup(total)
+    actor.set_loop(asyncio.get_running_loop())
+    task = asyncio.create_task(actor.run())
+    await asyncio.sleep(0)
+
+    gc.collect()
+    collections = sum(stat["collections"] for stat in gc.get_stats())
+    start = time.perf_counter()
+    # Bursts like Core.send from a handler, yielding between them
+    for i in range(total):
+        actor.send({"event": "track_position_updated", "position": i})
+        if i % 100 == 99:
+            await asyncio.sleep(0)
+    await actor.done.wait()
+    elapsed = time.perf_counter() - start
+    collections = sum(stat["collections"] for stat in gc.get_stats()) - collections
+
+    await actor.stop()
+    await asyncio.wait_for(task, timeout=5)
+    return total / elapsed, collections
+
+
+async def main(total: int):
+    for name, actor_class in (
+        ("legacy", LegacyCounter),
+        ("current", CurrentCounter),
+        ("current+batch", BatchCounter),
+    ):
+        rate, collections = await measure(actor_class, total)
+        print(f"{name:>14}: {rate:>12,.0f} msg/s  {collections:>6} gc runs")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else MESSAGES))
@@ -0,0 +1,83 @@
+"""
+Serialization cost of a JSON-RPC reply carrying a large directory listing,
+the previous validate/dump/loads/dump path against the single pass one.
+
+    python -m benchmarks.jsonrpc_response [tracks] [rounds]
+"""
+
+import json
+import sys
+import time
+
+from core.models import Album, Artist, Image, Track
+from core.util import handle_json, handle_json_ws, jsonrpc_result
+
+TRACKS = 5000
+ROUNDS = 20
+
+
+def build_tracks(count: int) -> list[Track]:
+    tracks = []
+    for i in range(count):
+        artist = Artist(uri=f"local:artist:{i % 200}", name=f"Artist {i % 200}")
+        album = Album(
+            uri=f"local:album:{i % 500}",
+            name=f"Album {i % 500}",
+            artists=frozenset([artist]),
+            images=(Image(uri=f"/images/local/{i % 500}.jpg"),),
+        )
+        tracks.append(
+            Track(
+                uri=f"local:/music/{i % 500}/{i}.flac",
+                name=f"Track {i}",
+                artists=frozenset([artist]),
+                albums=frozenset([album]),
+                track_no=i % 20 + 1,
+                length=180000 + i,
+                bitrate=1411,
+            )
+        )
+    return tracks
+
+
+def legacy_ws(result) -> bytes:
+    response = json.loads(handle_json({"jsonrpc": "2.0", "result": result, "id": 1}))
+    return handle_json_ws(response)
+
+
+def legacy_http(result) -> bytes:
+    response = json.loads(handle_json({"jsonrpc": "2.0", "result": result, "id": 1}))
+    # web.json_response
+    return json.dumps(response).encode("utf-8")
+
+
+def single_pass(result) -> bytes:
+    return jsonrpc_result(result, 1)
+
+
+def measure(func, result, rounds: int) -> tuple[float, int]:
+    func(result)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        payload = func(result)
+    return (time.perf_counter() - start) / rounds, len(payload)
+
+
+def main(count: int, rounds: int):
+    tracks = build_tracks(count)
+    assert json.loads(single_pass(tracks)) == json.loads(legacy_ws(tracks))
+    print(f"{count} tracks, {rounds} rounds")
+    for name, func in (
+        ("legacy /ws", legacy_ws),
+        ("legacy /rpc", legacy_http),
+        ("single pass", single_pass),
+    ):
+        seconds, size = measure(func, tracks, rounds)
+        print(f"{name:>12}: {seconds * 1000:8.1f} ms  {size / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else TRACKS,
+        int(sys.argv[2]) if len(sys.argv) > 2 else ROUNDS,
+    )
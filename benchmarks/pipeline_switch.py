@@ -0,0 +1,182 @@
+"""
+Track switch latency and memory growth while skipping through a queue, the
+long-lived playbin (READY, set uri, PLAYING) against the previous
+construction of a new pipeline, with another bus watch, for every track.
+
+    python -m benchmarks.pipeline_switch [tracks] [sink]
+
+Plays generated WAV files into a fakesink, pass `alsasink` as `sink` to
+include the ALSA device open/close in the measurement.
+"""
+
+import gi
+
+gi.require_version("Gst", "1.0")
+
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+from gi.repository import GLib, Gst
+
+from playback.playback import build_playbin
+
+TRACKS = 500
+FILES = 8
+SAMPLE_RATE = 44100
+SECONDS = 2
+SWITCH_TIMEOUT = 5 * Gst.SECOND
+
+
+def write_tracks(directory: str) -> list[str]:
+    uris = []
+    frames = b"".join(
+        struct.pack("<hh", i % 2000 - 1000, i % 2000 - 1000)
+        for i in range(SAMPLE_RATE * SECONDS)
+    )
+    for n in range(FILES):
+        path = os.path.join(directory, f"track{n}.wav")
+        with wave.open(path, "wb") as f:
+            f.setnchannels(2)
+            f.setsampwidth(2)
+            f.setframerate(SAMPLE_RATE)
+            f.writeframes(frames)
+        uris.append(Gst.filename_to_uri(path))
+    return uris
+
+
+def rss_kib() -> int:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def dispatch():
+    """Runs pending bus watch callbacks, as the application's main loop would."""
+    context = GLib.MainContext.default()
+    while context.pending():
+        context.iteration(False)
+
+
+def on_message(bus, message):
+    pass
+
+
+class LegacySwitcher:
+    """Pipeline handling as it was before the pipeline was reused."""
+
+    def __init__(self, sink_factory: str):
+        self._sink_factory = sink_factory
+        self._pipeline = None
+        self._convert = None
+
+    def _on_pad_added(self, decodebin, pad):
+        sink_pad = self._convert.get_static_pad("sink")
+        if not sink_pad.is_linked():
+            pad.link(sink_pad)
+
+    def switch(self, uri: str):
+        if self._pipeline is not None:
+            self._pipeline.set_state(Gst.State.NULL)
+        self._pipeline = Gst.Pipeline.new("audio-player")
+        source = Gst.ElementFactory.make("uridecodebin", "source")
+        self._convert = Gst.ElementFactory.make("audioconvert", "convert")
+        resample = Gst.ElementFactory.make("audioresample", "resample")
+        sink = Gst.ElementFactory.make(self._sink_factory, "sink")
+        resample.set_property("quality", 0)
+        sink.set_property("sync", False)
+        for el in [source, self._convert, resample, sink]:
+            self._pipeline.add(el)
+        self._convert.link(resample)
+        resample.link(sink)
+        source.connect("pad-added", self._on_pad_added)
+
+        bus = self._pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message", on_message)
+
+        source.set_property("uri", uri)
+        self._pipeline.set_state(Gst.State.PLAYING)
+        return self._pipeline.get_state(SWITCH_TIMEOUT)[0]
+
+    def close(self):
+        if self._pipeline is not None:
+            self._pipeline.set_state(Gst.State.NULL)
+
+
+class ReusedSwitcher:
+    """The playback extension's pipeline, one playbin and one bus watch."""
+
+    def __init__(self, sink_factory: str):
+        self._pipeline, _ = build_playbin(None, sink_factory)
+        bus = self._pipeline.get_bus()
+        bus.add_signal_watch()
+        self._handler_id = bus.connect("message", on_message)
+
+    def switch(self, uri: str):
+        self._pipeline.set_state(Gst.State.READY)
+        self._pipeline.set_property("uri", uri)
+        self._pipeline.set_state(Gst.State.PLAYING)
+        return self._pipeline.get_state(SWITCH_TIMEOUT)[0]
+
+    def close(self):
+        self._pipeline.set_state(Gst.State.NULL)
+        bus = self._pipeline.get_bus()
+        bus.disconnect(self._handler_id)
+        bus.remove_signal_watch()
+
+
+def run(switcher, uris: list[str], count: int) -> dict:
+    # First switch loads the plugins, keep it out of the numbers
+    switcher.switch(uris[0])
+    dispatch()
+    rss_start = rss_kib()
+    latencies = []
+    failures = 0
+    for i in range(count):
+        start = time.perf_counter()
+        result = switcher.switch(uris[i % len(uris)])
+        latencies.append(time.perf_counter() - start)
+        if result != Gst.StateChangeReturn.SUCCESS:
+            failures += 1
+        dispatch()
+    rss_end = rss_kib()
+    switcher.close()
+    latencies.sort()
+    return {
+        "median": statistics.median(latencies),
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "max": latencies[-1],
+        "rss_growth": rss_end - rss_start,
+        "failures": failures,
+    }
+
+
+def main(count: int, sink_factory: str):
+    Gst.init(None)
+    with tempfile.TemporaryDirectory() as directory:
+        uris = write_tracks(directory)
+        print(f"{count} track switches into {sink_factory}")
+        for name, switcher in (
+            ("legacy", LegacySwitcher),
+            ("reused", ReusedSwitcher),
+        ):
+            stats = run(switcher(sink_factory), uris, count)
+            print(
+                f"{name:>7}: median {stats['median'] * 1000:6.1f} ms"
+                f"  p95 {stats['p95'] * 1000:6.1f} ms"
+                f"  max {stats['max'] * 1000:6.1f} ms"
+                f"  RSS +{stats['rss_growth']} KiB"
+                f"  failed {stats['failures']}"
+            )
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else TRACKS,
+        sys.argv[2] if len(sys.argv) > 2 else "fakesink",
+    )
@@ -2,7 +2,8 @@ import logging
 import ast
 
 from core.actor import Actor
-from core.models import Track
+from core.models import Track, Page
+from core.util import encode_cursor, keyset_clause
 from playlist.utils import build_track, build_album, build_artist, to_serialize
 
 logger = logging.getLogger(__name__)
@@ -15,6 +16,15 @@ SQL_QUERY_CREATE_FAVOURITE = """
         item           TEXT
     );
     """
+PAGE_SIZE = 100
+
+# Keyset order per view: (sort columns, row keys for the cursor, descending)
+CURSOR_ORDER = {
+    "recent": (["COALESCE(last_played, '')", "uri"], ["last_played", "uri"], True),
+    "top100": (["play_count", "uri"], ["play_count", "uri"], True),
+    "favourite": (["COALESCE(name, '')", "uri"], ["name", "uri"], False),
+}
+
 SQL_QUERY_CREATE_HISTORY = """
     CREATE TABLE IF NOT EXISTS collection_history (
         uri            TEXT    PRIMARY KEY,
@@ -105,6 +115,7 @@ class CollectionExtension(Actor):
         uri: str | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        cursor: str | None = None,
     ):
         params = []
 
@@ -121,6 +132,34 @@ class CollectionExtension(Actor):
             sql += " WHERE name LIKE ? COLLATE NOCASE"
             params.append(f"{alpha}%")
 
+        if cursor is not None:
+            return self._directory_page(view, sql, params, limit, cursor)
+
+        sql = self._offset_sql(view, sql, limit, offset, params)
+        rows = self._db.fetchall(sql, params)
+        return self._build_items(view, rows)
+
+    def _directory_page(
+        self, view: str | None, sql: str, params: list, limit: int | None, cursor: str
+    ) -> Page:
+        columns, keys, descending = CURSOR_ORDER.get(view, (["uri"], ["uri"], False))
+        clause, values = keyset_clause(columns, cursor, descending)
+        limit = limit or PAGE_SIZE
+        direction = "DESC" if descending else "ASC"
+        sql += " AND " if params else " WHERE "
+        sql += f"{clause} ORDER BY "
+        sql += ", ".join(f"{column} {direction}" for column in columns)
+        sql += " LIMIT ?"
+        rows = self._db.fetchall(sql, [*params, *values, limit])
+        next_cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_cursor = encode_cursor(
+                ["" if last[key] is None else last[key] for key in keys]
+            )
+        return Page(items=self._build_items(view, rows), next_cursor=next_cursor)
+
+    def _offset_sql(self, view, sql, limit, offset, params) -> str:
         if view == "recent":
             sql += " ORDER BY last_played DESC"
         elif view == "top100":
@@ -136,8 +175,9 @@ class CollectionExtension(Actor):
             sql += " OFFSET ?"
             params.append(offset)
 
-        rows = self._db.fetchall(sql, params)
+        return sql
 
+    def _build_items(self, view: str | None, rows: list) -> list:
         if view == "favourite":
             items = []
             for row in rows:
@@ -26,7 +26,8 @@ class ConfigExtension(Actor):
     async def on_set(self, config):
         self._db.set_config(config)
         for ext in config:
-            self._core._request(f"{ext}.config_update", config=config)
+            if self._core.is_callable(f"{ext}.config_update"):
+                self._core._request(f"{ext}.config_update", config=config)
 
         self._core.send(
             target=["web", "display"], event="config_updated", config=config
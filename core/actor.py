@@ -1,57 +1,103 @@
 import asyncio
+import threading
 import traceback
 
+from concurrent import futures
+
+from .mailbox import Mailbox, BLOCK
+
+
+def blocking(func):
+    """
+    Marks a sync `on_<method>` handler as blocking (disk, SQLite, subprocess,
+    D-Bus, network). Core.request runs it in a worker thread instead of on the
+    event loop, at most `Actor.max_blocking` at a time per extension.
+    """
+    if asyncio.iscoroutinefunction(func):
+        raise TypeError(f"{func.__qualname__} is a coroutine, it cannot be blocking")
+    func.blocking = True
+    return func
+
 
 class Actor:
+    # Concurrent @blocking handlers allowed for this extension
+    max_blocking = 1
+    # Most messages handed to a single on_events call
+    max_batch = 64
+    # Mailbox bounds, see core.mailbox.Mailbox. Unbounded by default, control
+    # events and requests must not be lost, extensions that only render state
+    # opt into a bounded, lossy mailbox.
+    mailbox_size = 0
+    mailbox_overflow = BLOCK
+    # Events where only the latest pending message is kept
+    coalesce = ()
+
     def __init__(self):
-        self.queue = asyncio.Queue()
+        self.queue = Mailbox(
+            self.mailbox_size,
+            self.coalesce,
+            self.mailbox_overflow,
+            name=type(self).__name__,
+        )
         self.running = True
         self._loop = None
-        self._stop_event = None  
+        self._thread_id = None
+        self._task = None
+        self._waiting = False
 
     def set_loop(self, loop):
         self._loop = loop
 
-    async def _send(self, message):
-        await self.queue.put(message)
-
     def send(self, message):
         if self._loop is None or not self.running or self._loop.is_closed():
             return
+        if threading.get_ident() == self._thread_id:
+            try:
+                self.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # BLOCK policy, the loop cannot wait here so the message waits
+                self._loop.create_task(self.queue.put(message))
+            return
         try:
-            self._loop.call_soon_threadsafe(
-                lambda: asyncio.create_task(self._send(message))
-            )
-        except RuntimeError:
+            if self.queue.overflow == BLOCK and self.queue.maxsize > 0:
+                # Back-pressure on the producing thread
+                asyncio.run_coroutine_threadsafe(
+                    self.queue.put(message), self._loop
+                ).result()
+            else:
+                self._loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        except (RuntimeError, futures.CancelledError):
             pass
 
     async def stop(self):
         self.running = False
-        if self._stop_event:
-            self._stop_event.set()
+        # Only interrupt an idle consumer, a handler in progress runs to completion
+        if self._task is not None and self._waiting:
+            self._task.cancel()
 
     async def run(self):
         self._loop = asyncio.get_running_loop()
-        self._stop_event = asyncio.Event()
+        self._thread_id = threading.get_ident()
+        self._task = asyncio.current_task()
+        batched = type(self).on_events is not Actor.on_events
         try:
             await self.safe_call(self.on_start, "on_start")
             while self.running:
+                self._waiting = True
                 try:
-                    get_task = asyncio.create_task(self.queue.get())
-                    stop_task = asyncio.create_task(self._stop_event.wait())
-                    done, pending = await asyncio.wait(
-                        [get_task, stop_task],
-                        return_when=asyncio.FIRST_COMPLETED
-                    )
-                    for t in pending:
-                        t.cancel()
-                    if stop_task in done:
-                        break
-                    if get_task in done:
-                        message = get_task.result()
-                        await self.safe_call(self.on_event, "on_event", message)
-                except asyncio.CancelledError:
-                    break
+                    message = await self.queue.get()
+                finally:
+                    self._waiting = False
+
+                if batched:
+                    messages = [message]
+                    while len(messages) < self.max_batch and not self.queue.empty():
+                        messages.append(self.queue.get_nowait())
+                    await self.safe_call(self.on_events, "on_events", messages)
+                else:
+                    await self.safe_call(self.on_event, "on_event", message)
+        except asyncio.CancelledError:
+            pass
         except Exception:
             print(f"[{self.__class__.__name__}] Fatal error in actor loop:\n{traceback.format_exc()}")
         finally:
@@ -70,6 +116,14 @@ class Actor:
     async def on_stop(self): pass
     async def on_event(self, message): pass
 
+    async def on_events(self, messages):
+        """
+        Override to handle every queued message in one call (at most
+        `max_batch`), e.g. to keep only the latest of a burst of updates.
+        """
+        for message in messages:
+            await self.on_event(message)
+
 
 class SourceActor(Actor):
     pass
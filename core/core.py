@@ -1,23 +1,98 @@
 import asyncio
+import functools
 import importlib
+import inspect
+import time
 import yaml
 import logging
 
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from core.db import DBConnection
 
 logger = logging.getLogger(__name__)
 
+BLOCKING_WORKERS = 4
+LOOP_MONITOR_INTERVAL = 0.25
+LOOP_STALL_THRESHOLD = 0.1
+# Actor hooks, routable like any handler but not part of the listed API
+LIFECYCLE_HANDLERS = ("on_start", "on_stop", "on_event", "on_events")
+
+Route = namedtuple("Route", ["ext", "handler", "is_coroutine", "blocking"])
+
+
+class LoopMonitor:
+    """
+    Measures event loop stalls: how late a periodic wakeup fires compared to
+    when it was scheduled. Stalls above `threshold` are counted and logged.
+    `observer`, when set, is called with every lag sample.
+    """
+
+    def __init__(
+        self, interval=LOOP_MONITOR_INTERVAL, threshold=LOOP_STALL_THRESHOLD
+    ):
+        self._interval = interval
+        self._threshold = threshold
+        self._task = None
+        self.stalls = 0
+        self.stall_total = 0.0
+        self.stall_max = 0.0
+        self.lag = 0.0
+        self.observer = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            self.lag = max(0.0, loop.time() - expected)
+            if self.lag >= self._threshold:
+                self.stalls += 1
+                self.stall_total += self.lag
+                self.stall_max = max(self.stall_max, self.lag)
+                logger.debug(f"Event loop stalled for {self.lag * 1000:.0f} ms")
+            if self.observer is not None:
+                try:
+                    self.observer(self.lag)
+                except Exception as e:
+                    logger.error(f"Loop monitor observer failed: {e}", exc_info=True)
+
+    def stats(self) -> dict:
+        return {
+            "lag": self.lag,
+            "stalls": self.stalls,
+            "stall_total": self.stall_total,
+            "stall_max": self.stall_max,
+        }
+
 
 class Core:
     def __init__(self):
         self.db = DBConnection()
         self.extensions = []
         self.routes = defaultdict(list)
+        self.methods = {}
         self.tasks = []
         self._responses = {}
         self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(
+            max_workers=BLOCKING_WORKERS, thread_name_prefix="blocking"
+        )
+        self._blocking_limits = {}
+        self._blocking_active = defaultdict(int)
+        self.loop_monitor = LoopMonitor()
+        self.loop_monitor.start()
+        # Set by the metrics extension, see metrics/registry.py
+        self.metrics = None
 
     async def load_extensions_by_name(self, extension_names):
         extensions_to_start = []
@@ -50,15 +125,74 @@ class Core:
 
             self.extensions.append(ext)
             self.routes[name].append(ext)
+            self._register_methods(name, ext)
             extensions_to_start.append(ext)
 
             task = asyncio.create_task(ext.run())
             self.tasks.append(task)
 
+    def _register_methods(self, name: str, ext):
+        """Adds every `on_<method>` of `ext` to the routing table as `name.method`."""
+        for attr in dir(ext):
+            if not attr.startswith("on_"):
+                continue
+            handler = getattr(ext, attr)
+            if not callable(handler):
+                continue
+            self.methods[f"{name.lower()}.{attr[3:]}"] = Route(
+                ext=ext,
+                handler=handler,
+                is_coroutine=asyncio.iscoroutinefunction(handler),
+                blocking=getattr(handler, "blocking", False),
+            )
+
+    def _route(self, full_method: str) -> Route | None:
+        """
+        Returns the route of `full_method`, or None when its extension is not
+        loaded. Raises ValueError for unknown methods of a loaded extension.
+        """
+        route = self.methods.get(full_method)
+        if route is not None:
+            return route
+
+        if "." not in full_method:
+            raise ValueError("Method must be in form 'extension.method'")
+        ext_name, method_name = full_method.split(".", 1)
+        route = self.methods.get(f"{ext_name.lower()}.{method_name}")
+        if route is not None:
+            return route
+        if ext_name.lower() in self.routes:
+            raise ValueError(
+                f"Method '{method_name}' not found in extension '{ext_name}'"
+            )
+        return None
+
+    def api(self) -> dict:
+        """Lists every routable method with its parameters and summary."""
+        api = {}
+        for full_method, route in sorted(self.methods.items()):
+            if route.handler.__name__ in LIFECYCLE_HANDLERS:
+                continue
+            signature = inspect.signature(route.handler)
+            doc = inspect.getdoc(route.handler)
+            api[full_method] = {
+                "params": [
+                    {
+                        "name": param.name,
+                        "required": param.default is inspect.Parameter.empty,
+                    }
+                    for param in signature.parameters.values()
+                    if param.kind not in (param.VAR_POSITIONAL, param.VAR_KEYWORD)
+                ],
+                "async": route.is_coroutine,
+                "blocking": route.blocking,
+                "doc": doc.splitlines()[0] if doc else None,
+            }
+        return api
+
     async def send_to(self, name: str, message):
-        for ext in self.extensions:
-            if ext.__class__.__name__.lower().startswith(name.lower()):
-                await ext.send(message)
+        for ext in self.routes.get(name.lower(), []):
+            ext.send(message)
 
     def send(self, *, target: str | list[str] | None = None, **kwargs):
         if target is None:
@@ -74,53 +208,103 @@ class Core:
         for ext in targets:
             ext.send(msg)
 
+        if self.metrics is not None:
+            self.metrics.count_send(msg.get("event"), len(targets))
+
     def is_callable(self, full_method: str) -> bool:
-        if "." not in full_method:
-            raise ValueError("Method must be in form 'extension.method'")
-        ext_name, method_name = full_method.split(".", 1)
-        for ext in self.extensions:
-            if ext.__class__.__name__.lower().startswith(ext_name.lower()):
-                handler = getattr(ext, f"on_{method_name}", None)
-                if not callable(handler):
-                    return False
-                if asyncio.iscoroutinefunction(handler):
-                    return True
-                else:
-                    return True
-        return False
+        try:
+            return self._route(full_method) is not None
+        except ValueError:
+            if "." not in full_method:
+                raise
+            return False
 
     def _request(self, full_method, **params):
         if self._loop is None or self._loop.is_closed():
             return
         try:
             self._loop.call_soon_threadsafe(
-                lambda: asyncio.create_task(self.request(full_method, **params))
+                lambda: asyncio.create_task(self._request_task(full_method, params))
             )
         except RuntimeError:
             pass
 
+    async def _request_task(self, full_method, params):
+        try:
+            await self.request(full_method, **params)
+        except Exception as e:
+            logger.error(f"Error in {full_method}: {e}")
+
     async def request(self, full_method, **params):
+        if self.metrics is None:
+            return await self._dispatch(full_method, **params)
+
+        start = time.perf_counter()
+        error = False
+        try:
+            return await self._dispatch(full_method, **params)
+        except Exception:
+            error = True
+            raise
+        finally:
+            # Clients choose the method string, only routable ones get a series
+            method = full_method if full_method in self.methods else "unknown"
+            self.metrics.observe_request(method, time.perf_counter() - start, error)
+
+    async def _dispatch(self, full_method, **params):
         logger.debug(f"Requested {full_method} params={params}")
-        if "." not in full_method:
-            raise ValueError("Method must be in form 'extension.method'")
+        route = self._route(full_method)
+        if route is None:
+            logger.debug(f"Extension of {full_method} not found or disabled")
+            return
 
-        ext_name, method_name = full_method.split(".", 1)
-        for ext in self.extensions:
-            if ext.__class__.__name__.lower().startswith(ext_name.lower()):
-                handler = getattr(ext, f"on_{method_name}", None)
-
-                if not callable(handler):
-                    logger.warning(
-                        f"Method {method_name} not found in extension {ext_name}"
-                    )
-                    return
-
-                if asyncio.iscoroutinefunction(handler):
-                    return await handler(**params)
-                else:
-                    return handler(**params)
-        logger.debug(f"Extension {ext_name} not found or disabled")
-        return
+        if route.is_coroutine:
+            return await route.handler(**params)
+        elif route.blocking:
+            return await self._run_blocking(route.ext, route.handler, params)
+        else:
+            return self._run_inline(full_method, route.handler, params)
+
+    async def _run_blocking(self, ext, handler, params):
+        """Runs a @blocking handler in the worker pool, bounded per extension."""
+        limit = self._blocking_limits.get(ext)
+        if limit is None:
+            limit = self._blocking_limits[ext] = asyncio.Semaphore(ext.max_blocking)
+        async with limit:
+            self._blocking_active[ext] += 1
+            try:
+                return await self._loop.run_in_executor(
+                    self._executor, functools.partial(handler, **params)
+                )
+            finally:
+                self._blocking_active[ext] -= 1
+
+    def _run_inline(self, full_method, handler, params):
+        start = time.perf_counter()
+        try:
+            return handler(**params)
+        finally:
+            elapsed = time.perf_counter() - start
+            if elapsed >= LOOP_STALL_THRESHOLD:
+                logger.warning(
+                    f"{full_method} blocked the event loop for "
+                    f"{elapsed * 1000:.0f} ms, consider marking it @blocking"
+                )
+
+    def stats(self) -> dict:
+        return {
+            "loop": self.loop_monitor.stats(),
+            "blocking": {
+                ext._module_name: {
+                    "limit": ext.max_blocking,
+                    "active": self._blocking_active[ext],
+                }
+                for ext in self._blocking_limits
+            },
+            "mailboxes": {
+                ext._module_name: ext.queue.stats() for ext in self.extensions
+            },
+        }
 
     async def handle_response(self, message_id, response):
         if message_id in self._responses:
@@ -143,6 +327,9 @@ class Core:
             await asyncio.gather(*self.tasks, return_exceptions=True)
             self.tasks.clear()
 
+        self.loop_monitor.stop()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
         if self.db:
             try:
                 self.db.close()
@@ -2,7 +2,9 @@ import sqlite3
 import pathlib
 import logging
 import json
+import threading
 
+from contextlib import contextmanager
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -13,7 +15,11 @@ SCHEMA_INIT_SQL = """
         CREATE TABLE IF NOT EXISTS extensions (
             name TEXT PRIMARY KEY,
             config TEXT NOT NULL
-        )
+        );
+        CREATE TABLE IF NOT EXISTS schema_version (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
     """
 
 
@@ -31,6 +37,68 @@ def dict_factory(cursor, row):
     return d
 
 
+_NOCASE = str.maketrans(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz"
+)
+
+
+def nocase(value: str) -> str:
+    """Fold a value the way SQLite's NOCASE collation does (ASCII only)."""
+    return value.translate(_NOCASE)
+
+
+class IngestSession:
+    """
+    Groups many writes into one explicit transaction per `transaction()` block
+    instead of a commit after every statement. Also holds lookup caches that
+    are loaded once for the duration of the session.
+
+    The connection is shared with blocking handlers running in worker threads,
+    so every statement takes `lock` and a transaction never stays open across
+    an await: another caller committing would otherwise commit a half-written
+    batch.
+    """
+
+    def __init__(self, conn, lock):
+        self.conn = conn
+        self.lock = lock
+        self.caches = {}
+        self._cache_queries = {}
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield self
+            except BaseException:
+                self.conn.rollback()
+                # Ids created by the rolled back statements are gone
+                self.reload_caches()
+                raise
+            self.conn.commit()
+
+    def execute(self, query, params=()):
+        with self.lock:
+            return self.conn.execute(query, params)
+
+    def executemany(self, query, params):
+        with self.lock:
+            return self.conn.executemany(query, params)
+
+    def load_cache(self, name: str, query: str, key, value: str = "id") -> dict:
+        """Build a cache from a query, `key` maps a row to the cache key."""
+        self._cache_queries[name] = (query, key, value)
+        with self.lock:
+            rows = self.conn.execute(query).fetchall()
+        self.caches[name] = {key(row): row[value] for row in rows}
+        return self.caches[name]
+
+    def reload_caches(self):
+        for name, (query, key, value) in list(self._cache_queries.items()):
+            self.load_cache(name, query, key, value)
+
+
 class DBConnection:
     _instance = None
 
@@ -47,6 +115,8 @@ class DBConnection:
             conn.row_factory = dict_factory
 
             cls._instance.conn = conn
+            # Blocking handlers query from worker threads, one statement at a time
+            cls._instance.lock = threading.RLock()
             cls._instance.init_db()
 
         return cls._instance
@@ -56,35 +126,78 @@ class DBConnection:
         logger.debug(f"Database initialised")
 
     def execute(self, query, params=()):
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        self.conn.commit()
-        return cursor
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            self.conn.commit()
+            return cursor
 
     def executescript(self, script: str, params=None):
-        cursor = self.conn.cursor()
-        if params is None:
-            cursor.executescript(script)
-        else:
-            cursor.execute(script, params)
-        self.conn.commit()
-        return cursor
+        with self.lock:
+            cursor = self.conn.cursor()
+            if params is None:
+                cursor.executescript(script)
+            else:
+                cursor.execute(script, params)
+            self.conn.commit()
+            return cursor
 
     def executemany(self, sql: str, params: list[dict]):
-        cursor = self.conn.cursor()
-        cursor.executemany(sql, params)
-        self.conn.commit()
-        return cursor
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.executemany(sql, params)
+            self.conn.commit()
+            return cursor
+
+    def schema_version(self, name: str) -> int:
+        row = self.fetchone(
+            "SELECT version FROM schema_version WHERE name = ?", (name,)
+        )
+        return row.version if row else 0
+
+    def reset_schema_version(self, name: str):
+        self.execute("DELETE FROM schema_version WHERE name = ?", (name,))
+
+    def migrate(self, name: str, migrations: list[str]) -> int:
+        """
+        Runs the migration scripts of `name` newer than its stored schema
+        version, each one in its own transaction. Returns the new version.
+        """
+        version = self.schema_version(name)
+        for number, script in enumerate(migrations[version:], start=version + 1):
+            try:
+                with self.lock:
+                    self.conn.executescript(
+                        f"""
+                        BEGIN;
+                        {script}
+                        INSERT OR REPLACE INTO schema_version (name, version)
+                        VALUES ('{name}', {number});
+                        COMMIT;
+                        """
+                    )
+            except Exception:
+                if self.conn.in_transaction:
+                    self.conn.rollback()
+                raise
+            logger.info(f"Migrated {name} schema to version {number}")
+            version = number
+        return version
+
+    def ingest_session(self) -> IngestSession:
+        return IngestSession(self.conn, self.lock)
 
     def fetchall(self, query, params=()):
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchall()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchall()
 
     def fetchone(self, query, params=()):
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        return cursor.fetchone()
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchone()
 
     def close(self):
         if hasattr(self, "conn") and self.conn:
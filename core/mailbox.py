@@ -0,0 +1,96 @@
+import asyncio
+import logging
+
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = "drop_oldest"
+BLOCK = "block"
+
+
+def _event(message):
+    return message.get("event") if isinstance(message, dict) else None
+
+
+class Mailbox(asyncio.Queue):
+    """
+    Actor queue with a maximum size and per-event coalescing.
+
+    Messages whose event is in `coalesce` replace the pending message of the
+    same event in place, so a slow consumer only sees the latest one. When
+    full, `overflow` either drops the oldest message (DROP_OLDEST) or makes
+    `put` wait for room and `put_nowait` raise QueueFull (BLOCK). The first
+    drop is logged with `name`, later ones are only counted.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        coalesce=(),
+        overflow: str = DROP_OLDEST,
+        name: str = "mailbox",
+    ):
+        if overflow not in (DROP_OLDEST, BLOCK):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        super().__init__(maxsize)
+        self.coalesce = frozenset(coalesce)
+        self.overflow = overflow
+        self.name = name
+        self.dropped = 0
+        self.coalesced = 0
+
+    def _init(self, maxsize):
+        self._queue = deque()
+        self._latest = {}
+
+    def _put(self, message):
+        slot = [message]
+        event = _event(message)
+        if event in self.coalesce:
+            self._latest[event] = slot
+        self._queue.append(slot)
+
+    def _get(self):
+        slot = self._queue.popleft()
+        event = _event(slot[0])
+        if self._latest.get(event) is slot:
+            del self._latest[event]
+        return slot[0]
+
+    def _replace(self, message) -> bool:
+        slot = self._latest.get(_event(message))
+        if slot is None:
+            return False
+        slot[0] = message
+        self.coalesced += 1
+        return True
+
+    def put_nowait(self, message):
+        if self.coalesce and self._replace(message):
+            return
+        if self.full():
+            if self.overflow == BLOCK:
+                raise asyncio.QueueFull
+            oldest = self.get_nowait()
+            self.dropped += 1
+            if self.dropped == 1:
+                logger.warning(
+                    f"{self.name} is full ({self.maxsize}), dropping oldest messages,"
+                    f" first {_event(oldest)}"
+                )
+        super().put_nowait(message)
+
+    async def put(self, message):
+        if self.coalesce and self._replace(message):
+            return
+        await super().put(message)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.qsize(),
+            "maxsize": self.maxsize,
+            "overflow": self.overflow,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+        }
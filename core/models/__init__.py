@@ -186,6 +186,14 @@ class Playlist(BaseModel):
     last_modified: str | None = None
 
 
+class Page(BaseModel):
+    """A page of browse results, pass `next_cursor` back to get the next page."""
+
+    model: Literal["Page"] = Field(default="Page", alias="__model__", repr=False)
+    items: list = Field(default_factory=list)
+    next_cursor: str | None = None
+
+
 class State(BaseModel):
     model_config = ConfigDict(frozen=False)
     connected: bool = False
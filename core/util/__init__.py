@@ -1,5 +1,6 @@
 from pydantic import BaseModel, ConfigDict, TypeAdapter
 from typing import Any
+import base64
 import json
 import uuid
 import os
@@ -33,6 +34,9 @@ class SuccessResponse(BaseModel):
 Response = SuccessResponse | ErrorResponse
 ResponseTypeAdapter = TypeAdapter(Response | list[Response])
 ResponseTypeAdapterWs = TypeAdapter(Any)
+# Single type adapters, the Response union tries every member when serializing
+SuccessResponseAdapter = TypeAdapter(SuccessResponse)
+ErrorResponseAdapter = TypeAdapter(ErrorResponse)
 
 def handle_json(response: Any):
     if isinstance(response, dict):
@@ -49,5 +53,55 @@ def handle_json_ws(response: Any):
     return ResponseTypeAdapterWs.dump_json(response, by_alias=True)
 
 
+def jsonrpc_result(result: Any, req_id: RequestId | None) -> bytes:
+    """Serializes a JSON-RPC success response to bytes in a single pass."""
+    response = SuccessResponse.model_construct(id=req_id, result=result)
+    return SuccessResponseAdapter.dump_json(response, by_alias=True)
+
+
+def jsonrpc_error(
+    message: str, req_id: RequestId | None = None, code: int = -32603
+) -> bytes:
+    error = ErrorDetails(code=code, message=message)
+    response = ErrorResponse.model_construct(id=req_id, error=error)
+    return ErrorResponseAdapter.dump_json(response, by_alias=True)
+
+
 def generate_tlid():
-    return str(uuid.uuid4())[:8]
\ No newline at end of file
+    return str(uuid.uuid4())[:8]
+
+
+def encode_cursor(values: list) -> str:
+    """Opaque pagination cursor holding the sort key of the last returned item."""
+    data = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii")
+
+
+def decode_cursor(cursor: str | None) -> list | None:
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_clause(
+    columns: list[str], cursor: str | None, descending: bool = False
+) -> tuple[str, list]:
+    """
+    SQL condition selecting the rows after `cursor` for a query ordered by
+    `columns` (all ascending or all descending). Returns ("1", []) for the
+    first page.
+    """
+    values = decode_cursor(cursor)
+    if not values:
+        return "1", []
+    if len(values) != len(columns):
+        raise ValueError("Invalid cursor")
+    op = "<" if descending else ">"
+    placeholders = ", ".join("?" * len(columns))
+    return f"({', '.join(columns)}) {op} ({placeholders})", values
@@ -8,6 +8,7 @@ from pathlib import Path
 from typing import Optional, Tuple, Dict, Any
 
 from mutagen import File
+from PIL import Image as PILImage
 from mutagen.id3 import ID3, APIC, ID3NoHeaderError
 from mutagen.mp3 import MP3, HeaderNotFoundError
 from mutagen.flac import FLAC, Picture
@@ -27,6 +28,16 @@ logger = logging.getLogger(__name__)
 
 IMAGES_BASE_DIR = Path(__file__).parent.parent.parent / "web" / "www" / "images"
 
+
+def image_size(path) -> Optional[Tuple[int, int]]:
+    """(width, height) of an image file, only its header is read. None if unreadable."""
+    try:
+        with PILImage.open(path) as im:
+            return im.size
+    except (OSError, ValueError, PILImage.DecompressionBombError):
+        return None
+
+
 class Metadata:
     def __init__(self, cover_dir: str):
         if not cover_dir: 
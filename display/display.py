@@ -4,8 +4,9 @@ import json
 
 from pathlib import Path
 from core.actor import Actor
+from core.mailbox import DROP_OLDEST
 from core.types import PlaybackState, Command, EncoderMode, DisplayPage
-from core.models import RefType
+from core.models import RefType, Page
 from core.util.system import SystemUtil
 
 from .ssd1322 import DisplaySSD1322
@@ -16,9 +17,16 @@ logger = logging.getLogger(__name__)
 DISPLAY_LIST_PATH = Path(__file__).parent.parent / "display" / "display.json"
 DISPLAY_OVERLAY_TIMEOUT = 1.0
 DISPLAY_BLINK_TIMEOUT = 0.5
+DISPLAY_DIR_PAGE_SIZE = 50
+DISPLAY_DIR_PREFETCH = 8
 
 
 class DisplayExtension(Actor):
+    # Only renders the latest state, a backlog is not worth keeping
+    mailbox_size = 1000
+    mailbox_overflow = DROP_OLDEST
+    coalesce = ("track_position_updated", "scan_update", "playback_buffering")
+
     def __init__(self, name, core, db, config):
         super().__init__()
         self._name = name
@@ -42,6 +50,7 @@ class DisplayExtension(Actor):
         self._current_dir = None
         self._source_dir = None
         self._current_dir_breadcrumbs = []
+        self._current_dir_next = None
         self._source = None
         self._current_time = None
         self._power_state = "standby"
@@ -106,6 +115,7 @@ class DisplayExtension(Actor):
 
                 if self._action == Command.DOWN:
                     self.set_dir_scroll_down()
+                    await self.load_dir_next()
 
                 if self._action == Command.SELECT:
                     if self._page == DisplayPage.NOW_PLAYING:
@@ -144,6 +154,7 @@ class DisplayExtension(Actor):
                                 self._current_dir_breadcrumbs.append(
                                     {
                                         "items": self._current_dir,
+                                        "next": self._current_dir_next,
                                         "selected_index": selected_index,
                                         "scroll_offset": scroll_offset,
                                     }
@@ -160,11 +171,10 @@ class DisplayExtension(Actor):
                             elif selected_item.type == RefType.CATEGORY:
                                 if selected_item.uri:
                                     self.set_page(DisplayPage.LOADING)
-                                    _current_dir = await self._core.request(
+                                    await self.request_dir(
                                         f"{self._source.uri}.directory",
                                         uri=f"{selected_item.uri}",
                                     )
-                                    self.set_dir(_current_dir)
                                     self.set_page(DisplayPage.DIRECTORY)
 
                             elif (
@@ -212,15 +222,15 @@ class DisplayExtension(Actor):
                             ):
                                 if selected_item.uri:
                                     self.set_page(DisplayPage.LOADING)
-                                    _current_dir = await self._core.request(
+                                    await self.request_dir(
                                         "storage.directory", uri=f"{selected_item.uri}"
                                     )
-                                    self.set_dir(_current_dir)
                                     self.set_page(DisplayPage.DIRECTORY)
 
                 if self._action == Command.BACK:
                     if self._current_dir_breadcrumbs:
                         last_items = self._current_dir_breadcrumbs[-1]["items"]
+                        last_next = self._current_dir_breadcrumbs[-1]["next"]
                         last_selected_index = self._current_dir_breadcrumbs[-1][
                             "selected_index"
                         ]
@@ -234,11 +244,15 @@ class DisplayExtension(Actor):
                                     "storage.directory"
                                 )
                                 last_items = _current_dir
+                                last_next = None
                                 last_selected_index = 0
                                 last_scroll_offset = 0
 
                         self.set_dir(
-                            last_items, last_selected_index, last_scroll_offset
+                            last_items,
+                            last_selected_index,
+                            last_scroll_offset,
+                            next_page=last_next,
                         )
                         self.set_page(DisplayPage.DIRECTORY)
                         self._current_dir_breadcrumbs.pop()
@@ -259,10 +273,9 @@ class DisplayExtension(Actor):
                             if self._source.uri == "radio":
                                 if self._current_dir is None:
                                     self.set_page(DisplayPage.LOADING)
-                                    _current_dir = await self._core.request(
+                                    await self.request_dir(
                                         "radio.directory", uri="radio"
                                     )
-                                    self.set_dir(_current_dir)
 
                             elif self._source.uri == "local":
                                 if self._current_dir is None:
@@ -331,6 +344,11 @@ class DisplayExtension(Actor):
             elif event == "track_meta_updated":
                 self.set_current_track(message.get("tl_track").track)
 
+            elif event == "track_meta_changed":
+                track = self._current_track
+                if track is not None and track.uri == message.get("uri"):
+                    self.set_current_track(track.copy(update=message.get("changes")))
+
             elif event == "playback_state_changed":
                 self.set_playback_state(message.get("state"))
 
@@ -434,11 +452,57 @@ class DisplayExtension(Actor):
         if self._controller is not None:
             self._controller._set_current_track(track)
 
-    def set_dir(self, dir=None, selected_index=0, scroll_offset=0):
+    def set_dir(self, dir=None, selected_index=0, scroll_offset=0, next_page=None):
         self._current_dir = dir
+        self._current_dir_next = next_page
         if self._controller is not None:
             self._controller._set_dir(self._current_dir, selected_index, scroll_offset)
 
+    async def request_dir(self, method, **params):
+        """Loads the first page of a directory, later pages load while scrolling."""
+        result = await self._core.request(
+            method, cursor="", limit=DISPLAY_DIR_PAGE_SIZE, **params
+        )
+        if isinstance(result, Page):
+            next_page = None
+            if result.next_cursor:
+                next_page = (method, params, result.next_cursor)
+            self.set_dir(result.items, next_page=next_page)
+        else:
+            self.set_dir(result)
+
+    async def load_dir_next(self):
+        if self._current_dir_next is None or self._page != DisplayPage.DIRECTORY:
+            return
+        selected_item, selected_index, scroll_offset = (
+            self._controller._get_selected_item()
+        )
+        if selected_index < len(self._current_dir) - DISPLAY_DIR_PREFETCH:
+            return
+
+        items = self._current_dir
+        method, params, cursor = self._current_dir_next
+        self._current_dir_next = None
+        result = await self._core.request(
+            method, cursor=cursor, limit=DISPLAY_DIR_PAGE_SIZE, **params
+        )
+        if self._current_dir is not items:
+            # Navigated away while loading
+            return
+
+        next_page = None
+        if result.next_cursor:
+            next_page = (method, params, result.next_cursor)
+        selected_item, selected_index, scroll_offset = (
+            self._controller._get_selected_item()
+        )
+        self.set_dir(
+            items + result.items,
+            selected_index,
+            scroll_offset,
+            next_page=next_page,
+        )
+
     def set_playback_state(self, state):
         self._playback_state = state
         if self._controller is not None:
@@ -166,6 +166,7 @@ class DspExtension(Actor):
                         event="dsp_options_changed",
                         capture_device=capture_device,
                         sample_rate=new_sample_rate,
+                        capture_sample_rate=new_capture_rate or new_sample_rate,
                         sample_format=new_capture_format,
                         resample=self._resample_rate is not None
                     )
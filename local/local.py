@@ -4,15 +4,20 @@ import requests
 import os
 import re
 
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from urllib.parse import quote
-from core.actor import SourceActor
+from core.actor import SourceActor, blocking
 from core.types import PlaybackControls
-from core.util.metadata import Metadata
-from core.models import Image, RefType, Album, Artist, Category, Track, Source
+from core.db import nocase
+from core.util.metadata import Metadata, image_size
+from core.models import Image, RefType, Album, Artist, Category, Track, Source, Page
+from core.util import encode_cursor, keyset_clause
 from pathlib import Path
 from typing import Optional
 
+from .scanner import LibraryScanner, create_pool, worker_count
+from .watcher import LibraryWatcher
+
 logger = logging.getLogger(__name__)
 
 AUDIO_EXTS = {
@@ -37,6 +42,9 @@ ARTIST_IMAGES_WEB_PATH = Path("images") / "artist"
 
 AUDIO_DB_API = "https://www.theaudiodb.com/api/v1/json/123/search.php?s={artist}"
 BATCH_SIZE = 50
+SQL_MAX_PARAMS = 900
+INGEST_COMMIT_SIZE = 500
+PAGE_SIZE = 100
 
 SCHEMA_SQL = """
     PRAGMA journal_mode=WAL;
@@ -90,7 +98,159 @@ SCHEMA_SQL = """
         FOREIGN KEY (artist_id) REFERENCES artist(id) ON DELETE SET NULL,
         FOREIGN KEY (genre_id) REFERENCES genre(id) ON DELETE SET NULL
     );
+
+    CREATE TABLE IF NOT EXISTS scan_dir (
+        path TEXT PRIMARY KEY,
+        mtime REAL,
+        entries INTEGER
+    );
+    """
+
+# Applied in order on top of SCHEMA_SQL, append new steps, never edit old ones
+MIGRATIONS = [
+    # 1: (foreign key, name) indexes and trigger maintained track counts
+    """
+    CREATE INDEX IF NOT EXISTS idx_track_album ON track(album_id, name);
+    CREATE INDEX IF NOT EXISTS idx_track_artist ON track(artist_id, name);
+    CREATE INDEX IF NOT EXISTS idx_track_genre ON track(genre_id, name);
+    CREATE INDEX IF NOT EXISTS idx_track_name ON track(name);
+    CREATE INDEX IF NOT EXISTS idx_album_artist ON album(artist_id);
+
+    ALTER TABLE album ADD COLUMN track_count INTEGER NOT NULL DEFAULT 0;
+    ALTER TABLE artist ADD COLUMN track_count INTEGER NOT NULL DEFAULT 0;
+
+    UPDATE album SET track_count =
+        (SELECT COUNT(*) FROM track t WHERE t.album_id = album.id);
+    UPDATE artist SET track_count =
+        (SELECT COUNT(*) FROM track t WHERE t.artist_id = artist.id);
+
+    CREATE TRIGGER IF NOT EXISTS track_count_insert AFTER INSERT ON track
+    BEGIN
+        UPDATE album SET track_count = track_count + 1 WHERE id = NEW.album_id;
+        UPDATE artist SET track_count = track_count + 1 WHERE id = NEW.artist_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS track_count_delete AFTER DELETE ON track
+    BEGIN
+        UPDATE album SET track_count = track_count - 1 WHERE id = OLD.album_id;
+        UPDATE artist SET track_count = track_count - 1 WHERE id = OLD.artist_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS track_count_update_album
+    AFTER UPDATE OF album_id ON track
+    WHEN OLD.album_id IS NOT NEW.album_id
+    BEGIN
+        UPDATE album SET track_count = track_count - 1 WHERE id = OLD.album_id;
+        UPDATE album SET track_count = track_count + 1 WHERE id = NEW.album_id;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS track_count_update_artist
+    AFTER UPDATE OF artist_id ON track
+    WHEN OLD.artist_id IS NOT NEW.artist_id
+    BEGIN
+        UPDATE artist SET track_count = track_count - 1 WHERE id = OLD.artist_id;
+        UPDATE artist SET track_count = track_count + 1 WHERE id = NEW.artist_id;
+    END;
+    """,
+    # 2: full text search over names, prefix and diacritic insensitive
     """
+    CREATE VIRTUAL TABLE IF NOT EXISTS track_fts USING fts5(
+        name,
+        content='track',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS track_fts_insert AFTER INSERT ON track
+    BEGIN
+        INSERT INTO track_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS track_fts_delete AFTER DELETE ON track
+    BEGIN
+        INSERT INTO track_fts (track_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS track_fts_update AFTER UPDATE OF name ON track
+    BEGIN
+        INSERT INTO track_fts (track_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+        INSERT INTO track_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    INSERT INTO track_fts (track_fts) VALUES ('rebuild');
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS album_fts USING fts5(
+        name,
+        content='album',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS album_fts_insert AFTER INSERT ON album
+    BEGIN
+        INSERT INTO album_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS album_fts_delete AFTER DELETE ON album
+    BEGIN
+        INSERT INTO album_fts (album_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS album_fts_update AFTER UPDATE OF name ON album
+    BEGIN
+        INSERT INTO album_fts (album_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+        INSERT INTO album_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    INSERT INTO album_fts (album_fts) VALUES ('rebuild');
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS artist_fts USING fts5(
+        name,
+        content='artist',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS artist_fts_insert AFTER INSERT ON artist
+    BEGIN
+        INSERT INTO artist_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS artist_fts_delete AFTER DELETE ON artist
+    BEGIN
+        INSERT INTO artist_fts (artist_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS artist_fts_update AFTER UPDATE OF name ON artist
+    BEGIN
+        INSERT INTO artist_fts (artist_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+        INSERT INTO artist_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    INSERT INTO artist_fts (artist_fts) VALUES ('rebuild');
+
+    CREATE VIRTUAL TABLE IF NOT EXISTS genre_fts USING fts5(
+        name,
+        content='genre',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    );
+    CREATE TRIGGER IF NOT EXISTS genre_fts_insert AFTER INSERT ON genre
+    BEGIN
+        INSERT INTO genre_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS genre_fts_delete AFTER DELETE ON genre
+    BEGIN
+        INSERT INTO genre_fts (genre_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+    END;
+    CREATE TRIGGER IF NOT EXISTS genre_fts_update AFTER UPDATE OF name ON genre
+    BEGIN
+        INSERT INTO genre_fts (genre_fts, rowid, name)
+        VALUES ('delete', OLD.id, OLD.name);
+        INSERT INTO genre_fts (rowid, name) VALUES (NEW.id, NEW.name);
+    END;
+    INSERT INTO genre_fts (genre_fts) VALUES ('rebuild');
+    """,
+]
 QUERIES = {
     "track": """
         SELECT
@@ -109,7 +269,7 @@ QUERIES = {
         LEFT JOIN artist ar ON a.artist_id = ar.id
         LEFT JOIN genre g ON a.genre_id = g.id
         WHERE %s
-        ORDER BY a.name ASC
+        ORDER BY a.name ASC, a.id ASC
     """,
     "album": """
         SELECT 
@@ -120,21 +280,19 @@ QUERIES = {
             a.artist_id,
             ar.name AS artist_name,
             ar.image AS artist_image,
-            COUNT(t.id) AS length
+            a.track_count AS length
         FROM album a
         LEFT JOIN artist ar ON a.artist_id = ar.id
-        LEFT JOIN track t ON t.album_id = a.id
         WHERE %s
-        GROUP BY a.id, ar.name
-        ORDER BY a.name ASC
+        ORDER BY a.name ASC, a.id ASC
     """,
     "artist": f"""
             SELECT 
                 a.*,
-                (SELECT COUNT(*) FROM track t WHERE t.artist_id = a.id) AS length
+                a.track_count AS length
             FROM artist a
             WHERE %s
-            ORDER BY a.name ASC
+            ORDER BY a.name ASC, a.id ASC
             
         """,
     "genre": """
@@ -143,10 +301,33 @@ QUERIES = {
             (SELECT COUNT(*) FROM track t WHERE t.genre_id = a.id) AS length
         FROM genre a
         WHERE %s
-        ORDER BY a.name ASC
+        ORDER BY a.name ASC, a.id ASC
     """,
 }
 
+TRACK_UPSERT_SQL = """
+    INSERT INTO track
+        (path, file_name, name, track_number, disc_number, length, bitrate, sample_rate,
+        album_id, artist_id, genre_id, image, mtime)
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)
+    ON CONFLICT(path) DO UPDATE SET
+        file_name=excluded.file_name,
+        name=excluded.name,
+        track_number=excluded.track_number,
+        disc_number=excluded.disc_number,
+        length=excluded.length,
+        bitrate=excluded.bitrate,
+        sample_rate=excluded.sample_rate,
+        album_id=excluded.album_id,
+        artist_id=excluded.artist_id,
+        genre_id=excluded.genre_id,
+        image=excluded.image,
+        mtime=excluded.mtime
+    """
+
+FTS_TABLES = ("track", "album", "artist", "genre")
+SEARCH_CATEGORIES = ("track", "artist", "album")
+
 TYPES = {
     "track": RefType.TRACK,
     "album": RefType.ALBUM,
@@ -156,6 +337,8 @@ TYPES = {
 
 
 class LocalExtension(SourceActor):
+    max_blocking = 2
+
     def __init__(self, name, core, db, config):
         super().__init__()
         self._name = name
@@ -164,6 +347,13 @@ class LocalExtension(SourceActor):
         self._config = config
         self._metadata = Metadata(cover_dir="album")
         self._scan_progress = None
+        self._scanning = False
+        self._session = None
+        self._ingest_pending = []
+        self._pool = None
+        self._pool_workers = 0
+        self._watcher = None
+        self._image_cache = {}
         self._source = Source(
             name="Library",
             uri=self._name,
@@ -184,12 +374,58 @@ class LocalExtension(SourceActor):
         pass
 
     async def on_start(self):
-        self._db.executescript(SCHEMA_SQL)
+        self._init_schema()
+        await self._start_watcher()
         logger.info("Started")
 
     async def on_stop(self):
+        await self._stop_watcher()
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
         logger.info("Stopped")
 
+    async def on_config_update(self, config):
+        updated_config = config[self._name]
+        if not updated_config:
+            return
+
+        if {"library_path", "watch", "watch_debounce"} & updated_config.keys():
+            await self._stop_watcher()
+            await self._start_watcher()
+
+    def _init_schema(self):
+        self._db.executescript(SCHEMA_SQL)
+        self._db.migrate(self._name, MIGRATIONS)
+
+    def _library_paths(self, config: dict) -> list[str]:
+        return [
+            path.removeprefix("storage:") for path in config.get("library_path", [])
+        ]
+
+    async def _start_watcher(self):
+        _local_config = self._db.get_config().get(self._name, {})
+        if not _local_config.get("watch"):
+            return
+
+        self._watcher = LibraryWatcher(
+            self._library_paths(_local_config),
+            on_changes=self.ingest_paths,
+            on_overflow=self.scan_and_ingest,
+            debounce=_local_config.get("watch_debounce", 2),
+        )
+        try:
+            self._watcher.start()
+        except OSError as e:
+            logger.error(f"Library watcher unavailable: {e}")
+            await self._watcher.stop()
+            self._watcher = None
+
+    async def _stop_watcher(self):
+        if self._watcher:
+            await self._watcher.stop()
+            self._watcher = None
+
     def _directories(self):
         Item = namedtuple("Item", ["uri", "name", "type"])
         _dirs = [
@@ -200,38 +436,72 @@ class LocalExtension(SourceActor):
         ]
         return _dirs
 
-    def on_search(self, query: str) -> dict:
-        tables = ["track", "artist", "album"]
+    @blocking
+    def on_search(
+        self,
+        query: str,
+        limit: int | None = None,
+        offset: int | None = None,
+        categories: list[str] | None = None,
+    ) -> dict:
+        """
+        Full text search by name, best matches first. `limit` and `offset`
+        apply per category; genre results are only returned when asked for.
+        """
+        match = self._fts_query(query)
         result = {}
-        for table in tables:
-            sql = QUERIES[table] % "a.name LIKE ? COLLATE NOCASE"
-            rows = self._db.fetchall(sql, (f"%{query}%",))
-            if table == "track":
-                result[table] = [Track(**self.build_track(row)) for row in rows]
-            elif table == "artist":
-                result[table] = [Artist(**self.build_artist(row)) for row in rows]
-            elif table == "album":
-                result[table] = [Album(**self.build_album(row)) for row in rows]
+        for table in categories or SEARCH_CATEGORIES:
+            if table not in FTS_TABLES:
+                raise ValueError(f"Category '{table}' not supported")
+            if not match:
+                result[table] = []
+                continue
+
+            sql = (
+                f"SELECT rowid FROM {table}_fts "
+                f"WHERE {table}_fts MATCH ? ORDER BY rank"
+            )
+            params = [match]
+            if limit is not None or offset is not None:
+                sql += " LIMIT ? OFFSET ?"
+                params.extend([-1 if limit is None else limit, offset or 0])
+            ids = [row.rowid for row in self._db.fetchall(sql, params)]
+
+            rows = {}
+            for i in range(0, len(ids), SQL_MAX_PARAMS):
+                chunk = ids[i : i + SQL_MAX_PARAMS]
+                where = "a.id IN (%s)" % ",".join("?" * len(chunk))
+                for row in self._db.fetchall(QUERIES[table] % where, chunk):
+                    rows[row["id"]] = row
+            result[table] = self.build_models(
+                table, [rows[ref_id] for ref_id in ids if ref_id in rows]
+            )
         return result
 
+    def _fts_query(self, query: str) -> str:
+        """Turns user input into an FTS5 prefix query, every word must match."""
+        words = re.findall(r"\w+", query or "")
+        return " ".join('"%s"*' % word for word in words)
+
+    @blocking
     def on_directory(
         self,
         uri: str | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        cursor: str | None = None,
     ):
+        """
+        Lists a directory. Passing `cursor` (empty for the first page) returns a
+        Page of `limit` items ordered by (name, id) with a `next_cursor`, seeking
+        by key instead of OFFSET so deep pages cost the same as the first.
+        """
         if not uri:
             return self._directories()
 
         values = uri.split(":")
         values_len = len(values)
 
-        builders = {
-            "album":  lambda row: Album(**self.build_album(row)),
-            "artist": lambda row: Artist(**self.build_artist(row)),
-            "track":  lambda row: Track(**self.build_track(row)),
-            "genre":  lambda row: Category(**self.build_category(row, "genre")),
-        }
         if values_len == 4:
             ext, view, ref_id, ref_type = values
 
@@ -241,8 +511,12 @@ class LocalExtension(SourceActor):
             if ref_type != "tracks":
                 raise ValueError(f"View type '{ref_type}' not supported")
             
+            if cursor is not None:
+                return self._directory_page(
+                    "track", limit, cursor, f"a.{view}_id = ?", [ref_id]
+                )
             rows = self._db.fetchall(QUERIES["track"] % f"a.{view}_id = {ref_id}")
-            return [Track(**self.build_track(row)) for row in rows]
+            return self.build_models("track", rows)
 
         if values_len == 3:
             ext, view, ref_id = values
@@ -251,10 +525,12 @@ class LocalExtension(SourceActor):
                     rows = self._db.fetchall(QUERIES[view] % "a.id = ?", (ref_id,))
                 else:
                     rows = self._db.fetchall(QUERIES[view] % "a.name LIKE ?", (f"{ref_id}%",))
-                return [builders[view](row) for row in rows]
+                return self.build_models(view, rows)
 
         if values_len == 2:
             ext, view = values
+            if cursor is not None:
+                return self._directory_page(view, limit, cursor)
             sql = QUERIES[view].rstrip(";") % "1"
             params = []
             if limit is not None:
@@ -264,22 +540,99 @@ class LocalExtension(SourceActor):
                 sql += " OFFSET ?"
                 params.append(offset)
             rows = self._db.fetchall(sql, params)
-            return [builders[view](row) for row in rows]
+            return self.build_models(view, rows)
 
+    def _directory_page(
+        self,
+        view: str,
+        limit: int | None,
+        cursor: str,
+        where: str = "1",
+        params: list | None = None,
+    ) -> Page:
+        if view not in QUERIES:
+            raise ValueError(f"View '{view}' not supported")
+        limit = limit or PAGE_SIZE
+        clause, values = keyset_clause(["a.name", "a.id"], cursor)
+        sql = QUERIES[view] % f"{where} AND {clause}" + " LIMIT ?"
+        rows = self._db.fetchall(sql, [*(params or []), *values, limit])
+        next_cursor = None
+        if len(rows) == limit:
+            next_cursor = encode_cursor([rows[-1]["name"], rows[-1]["id"]])
+        return Page(items=self.build_models(view, rows), next_cursor=next_cursor)
+
+    def build_models(self, view: str, rows: list) -> list:
+        """
+        Builds models for a page of rows. Favourites and artist albums are
+        loaded with one query per page instead of one query per row.
+        """
+        if view == "genre":
+            return [Category(**self.build_category(row, "genre")) for row in rows]
+
+        if view == "track":
+            uris = [f"{self._name}:{row['path']}" for row in rows]
+        else:
+            uris = [f"{self._name}:{view}:{row['id']}" for row in rows]
+        favourites = self._favourites(uris)
+
+        if view == "track":
+            return [Track(**self.build_track(row, favourites)) for row in rows]
+        if view == "album":
+            return [Album(**self.build_album(row, favourites)) for row in rows]
+        if view == "artist":
+            albums = self._albums_by_artist([row["id"] for row in rows])
+            return [
+                Artist(**self.build_artist(row, favourites, albums)) for row in rows
+            ]
+        raise ValueError(f"View '{view}' not supported")
+
+    def _favourites(self, uris: list[str]) -> set[str]:
+        favourites = set()
+        for i in range(0, len(uris), SQL_MAX_PARAMS):
+            chunk = uris[i : i + SQL_MAX_PARAMS]
+            rows = self._db.fetchall(
+                "SELECT uri FROM collection_favourite WHERE uri IN (%s)"
+                % ",".join("?" * len(chunk)),
+                chunk,
+            )
+            favourites.update(row.uri for row in rows)
+        return favourites
+
+    def _albums_by_artist(self, artist_ids: list[int]) -> dict[int, list]:
+        albums = defaultdict(list)
+        for i in range(0, len(artist_ids), SQL_MAX_PARAMS):
+            chunk = artist_ids[i : i + SQL_MAX_PARAMS]
+            rows = self._db.fetchall(
+                "SELECT * FROM album WHERE artist_id IN (%s)"
+                % ",".join("?" * len(chunk)),
+                chunk,
+            )
+            for row in rows:
+                albums[row.artist_id].append(row)
+        return albums
 
     def _resolve_images(self, images_dir, images_web_path, image_filename):
         if not image_filename:
             return []
         full_path = images_dir / image_filename
-        web_path = images_web_path / image_filename
-        if full_path.is_file():
-            return [Image(uri=str(web_path))]
+        if full_path not in self._image_cache:
+            self._image_cache[full_path] = image_size(full_path)
+        size = self._image_cache[full_path]
+        if size:
+            width, height = size
+            return [
+                Image(
+                    uri=str(images_web_path / image_filename),
+                    width=width,
+                    height=height,
+                )
+            ]
         return []
 
-    def build_album(self, row):
+    def build_album(self, row, favourites: set | None = None):
         obj = {}
         obj["uri"] = f"{self._name}:album:{row['id']}"
-        obj["favourite"] = self._is_favourite(f"{self._name}:album:{row['id']}")
+        obj["favourite"] = self._is_favourite(obj["uri"], favourites)
 
         if row["name"]:
             obj["name"] = row["name"]
@@ -307,17 +660,22 @@ class LocalExtension(SourceActor):
         )
         return obj
 
-    def build_artist(self, row):
+    def build_artist(
+        self, row, favourites: set | None = None, albums: dict | None = None
+    ):
         obj = {}
         obj["uri"] = f"{self._name}:artist:{row['id']}"
-        obj["favourite"] = self._is_favourite(f"{self._name}:artist:{row['id']}")
+        obj["favourite"] = self._is_favourite(obj["uri"], favourites)
 
         if row["name"]:
             obj["name"] = row["name"]
 
-        albums = self._db.fetchall(
-            "SELECT * FROM album WHERE artist_id = ?", (row["id"],)
-        )
+        if albums is None:
+            albums = self._db.fetchall(
+                "SELECT * FROM album WHERE artist_id = ?", (row["id"],)
+            )
+        else:
+            albums = albums.get(row["id"])
         if albums:
             obj["albums"] = frozenset(
                 [
@@ -361,10 +719,10 @@ class LocalExtension(SourceActor):
 
         return obj
 
-    def build_track(self, row):
+    def build_track(self, row, favourites: set | None = None):
         obj = {}
         obj["uri"] = f"{self._name}:{row['path']}"
-        obj["favourite"] = self._is_favourite(f"{self._name}:{row['path']}")
+        obj["favourite"] = self._is_favourite(obj["uri"], favourites)
 
         if row["name"]:
             obj["name"] = row["name"]
@@ -418,7 +776,9 @@ class LocalExtension(SourceActor):
         )
         return obj
 
-    def _is_favourite(self, uri):
+    def _is_favourite(self, uri, favourites: set | None = None):
+        if favourites is not None:
+            return uri in favourites
         row = self._db.fetchone(
             'SELECT 1 FROM collection_favourite WHERE uri = ? LIMIT 1',
             (uri,)
@@ -451,8 +811,15 @@ class LocalExtension(SourceActor):
             DROP TABLE IF EXISTS album;
             DROP TABLE IF EXISTS genre;
             DROP TABLE IF EXISTS track;
+            DROP TABLE IF EXISTS scan_dir;
+            DROP TABLE IF EXISTS track_fts;
+            DROP TABLE IF EXISTS album_fts;
+            DROP TABLE IF EXISTS artist_fts;
+            DROP TABLE IF EXISTS genre_fts;
         """
         )
+        self._db.reset_schema_version(self._name)
+        self._init_schema()
         logger.info("Cleared library")
 
         for path in Path(ALBUM_IMAGES_DIR).iterdir():
@@ -463,14 +830,35 @@ class LocalExtension(SourceActor):
                 except Exception as e:
                     logger.warning(f"Could not delete {path}: {e}")
 
+        self._image_cache.clear()
         logger.info("Cleared images in %s", ALBUM_IMAGES_DIR)
         return True
 
+    @blocking
+    def on_explain(self) -> dict:
+        """Returns EXPLAIN QUERY PLAN output of the browse queries, for debugging."""
+        conditions = {
+            "all": ("1", ()),
+            "id": ("a.id = ?", (0,)),
+            "name": ("a.name LIKE ?", ("a%",)),
+        }
+        plans = {}
+        for view, query in QUERIES.items():
+            for label, (where, params) in conditions.items():
+                rows = self._db.fetchall(f"EXPLAIN QUERY PLAN {query % where}", params)
+                plans[f"{view}:{label}"] = [row.detail for row in rows]
+
+        for view in ("album", "artist", "genre"):
+            query = QUERIES["track"] % f"a.{view}_id = ?"
+            rows = self._db.fetchall(f"EXPLAIN QUERY PLAN {query}", (0,))
+            plans[f"track:{view}"] = [row.detail for row in rows]
+        return plans
+
     def on_scan_progress(self):
         return self._scan_progress
 
-    def on_scan(self):
-        asyncio.create_task(self.scan_and_ingest())
+    def on_scan(self, full: bool = False):
+        asyncio.create_task(self.scan_and_ingest(full=full))
         return True
 
     def on_scan_artists(self):
@@ -556,6 +944,7 @@ class LocalExtension(SourceActor):
                     logger.debug(f"Skipping {artist.name}, already has image.")
                 else:
                     self.download_artist_image(result["thumb"], filename)
+                    self._image_cache.pop(filename, None)
                     logger.debug(f"Saved {artist.name} image to {filename}")
                     _scan_artist_progress["downloaded"] += 1
 
@@ -599,18 +988,21 @@ class LocalExtension(SourceActor):
     ) -> Optional[int]:
         """
         Insert if not exists, ignoring case for uniqueness.
+        Lookups are served from the ingest session cache.
         """
         value = self.normalize_name(value)
         if not value:
             return None
 
-        row = self._db.fetchone(
-            f"SELECT id FROM {table} WHERE {field} = ? COLLATE NOCASE", (value,)
-        )
-        if row:
-            return row.id  # thanks to AttrRow
+        cache = self._session.caches[table]
+        key = nocase(value)
+        if key in cache:
+            return cache[key]
 
-        cur = self._db.execute(f"INSERT INTO {table} ({field}) VALUES (?)", (value,))
+        cur = self._session.execute(
+            f"INSERT INTO {table} ({field}) VALUES (?)", (value,)
+        )
+        cache[key] = cur.lastrowid
         return cur.lastrowid
 
     def get_or_create_album(
@@ -624,39 +1016,182 @@ class LocalExtension(SourceActor):
         if not name:
             return None
 
-        row = self._db.fetchone(
-            "SELECT id, image FROM album WHERE name = ? COLLATE NOCASE "
-            "AND (artist_id IS ? OR artist_id = ?)",
-            (name, artist_id, artist_id),
-        )
+        albums = self._session.caches["album"]
+        album_images = self._session.caches["album_image"]
+        key = (nocase(name), artist_id)
 
-        if row:
+        if key in albums:
+            album_id = albums[key]
             # If no image is stored yet, update with new one
-            if image and not row.image:
-                self._db.execute("UPDATE album SET image=? WHERE id=?", (image, row.id))
-            return row.id
+            if image and not album_images.get(album_id):
+                self._session.execute(
+                    "UPDATE album SET image=? WHERE id=?", (image, album_id)
+                )
+                album_images[album_id] = image
+            return album_id
 
-        cur = self._db.execute(
+        cur = self._session.execute(
             "INSERT INTO album (name, artist_id, year, image) VALUES (?, ?, ?, ?)",
             (name, artist_id, year, image),
         )
+        albums[key] = cur.lastrowid
+        album_images[cur.lastrowid] = image
         return cur.lastrowid
 
+    def _load_ingest_caches(self, session):
+        session.load_cache(
+            "artist", "SELECT id, name FROM artist", key=lambda r: nocase(r.name)
+        )
+        session.load_cache(
+            "genre", "SELECT id, name FROM genre", key=lambda r: nocase(r.name)
+        )
+        session.load_cache(
+            "album",
+            "SELECT id, name, artist_id FROM album",
+            key=lambda r: (nocase(r.name), r.artist_id),
+        )
+        session.load_cache(
+            "album_image",
+            "SELECT id, image FROM album",
+            key=lambda r: r.id,
+            value="image",
+        )
+
     def is_audio(self, filename: str) -> bool:
         return os.path.splitext(filename)[1].lower() in AUDIO_EXTS
 
-    async def scan_and_ingest(self):
-        
-        _config = self._db.get_config()
-        _scan_paths = [
-            path.removeprefix("storage:")
-            for path in _config.get("local", {}).get("library_path", [])
+    def ingest_file(self, fullpath, mtime, cover_path, tags) -> tuple | None:
+        """Resolves artist, genre and album ids and returns the track row to upsert."""
+        artist_id = self.get_or_create("artist", "name", tags["artist"])
+        genre_id = self.get_or_create("genre", "name", tags["genre"])
+        album_id = self.get_or_create_album(
+            tags["album"], artist_id, tags["year"], cover_path
+        )
+
+        logger.debug(f"Processing file:{fullpath}")
+
+        if not tags["length"]:
+            return None
+
+        return (
+            fullpath,
+            os.path.basename(fullpath),
+            tags["name"],
+            tags["track_number"],
+            tags["disc_number"],
+            tags["length"],
+            tags["bitrate"],
+            tags["sample_rate"],
+            album_id,
+            artist_id,
+            genre_id,
+            cover_path,
+            mtime,
+        )
+
+    def ingest_batch(self, batch: list[tuple]):
+        """Queues extracted files, they are written once INGEST_COMMIT_SIZE are pending."""
+        self._ingest_pending.extend(batch)
+        if len(self._ingest_pending) >= INGEST_COMMIT_SIZE:
+            self.flush_ingest()
+
+    def flush_ingest(self):
+        """Writes the pending files in one transaction and reports scan progress."""
+        batch, self._ingest_pending = self._ingest_pending, []
+        if not batch:
+            return
+
+        last_report = self._scan_progress["processed"] // BATCH_SIZE
+        rows = []
+
+        with self._session.transaction() as session:
+            for fullpath, mtime, track_id, cover_path, tags in batch:
+                try:
+                    row = self.ingest_file(fullpath, mtime, cover_path, tags)
+                except Exception as e:
+                    logger.error(f"Error processing {fullpath}: {e}", exc_info=True)
+                    continue
+                if row is None:
+                    continue
+
+                rows.append(row)
+                self._scan_progress["updated" if track_id else "inserted"] += 1
+                self._scan_progress["processed"] += 1
+
+            if rows:
+                session.executemany(TRACK_UPSERT_SQL, rows)
+
+        if self._scan_progress["processed"] // BATCH_SIZE != last_report:
+            self._core.send(
+                target=["web", "display"],
+                event="scan_update",
+                progress=self._scan_progress.copy(),
+            )
+            logger.info(self._scan_progress)
+
+    def _prune(self, session, scanner: LibraryScanner, known: dict):
+        """Removes tracks and directory entries under the scanned roots that are gone."""
+        prefixes = tuple(os.path.join(root, "") for root in scanner.roots)
+        if not prefixes:
+            return
+
+        removed = [
+            (track_id,)
+            for path, (track_id, _) in known.items()
+            if path.startswith(prefixes) and path not in scanner.seen
+        ]
+        if removed:
+            session.executemany("DELETE FROM track WHERE id = ?", removed)
+            self._scan_progress["removed"] += len(removed)
+            logger.info(f"Removed {len(removed)} missing tracks")
+
+        stale_dirs = [
+            (row.path,)
+            for row in self._db.fetchall("SELECT path FROM scan_dir")
+            if os.path.join(row.path, "").startswith(prefixes)
+            and row.path not in scanner.dirs
         ]
+        if stale_dirs:
+            session.executemany("DELETE FROM scan_dir WHERE path = ?", stale_dirs)
+
+        session.executemany(
+            "INSERT OR REPLACE INTO scan_dir (path, mtime, entries) VALUES (?, ?, ?)",
+            [(path, mtime, entries) for path, (mtime, entries) in scanner.dirs.items()],
+        )
+        # Retagged files can leave albums behind too
+        self._prune_orphans(session)
+
+    def _prune_orphans(self, session):
+        """Removes albums and artists left without tracks."""
+        session.execute(
+            """
+            DELETE FROM album
+            WHERE NOT EXISTS (SELECT 1 FROM track t WHERE t.album_id = album.id)
+            """
+        )
+        session.execute(
+            """
+            DELETE FROM artist
+            WHERE NOT EXISTS (SELECT 1 FROM track t WHERE t.artist_id = artist.id)
+            AND NOT EXISTS (SELECT 1 FROM album a WHERE a.artist_id = artist.id)
+            """
+        )
+        session.reload_caches()
+
+    async def scan_and_ingest(self, full: bool = False):
+        if self._scanning:
+            logger.warning("Scan already in progress")
+            return
+
+        _config = self._db.get_config()
+        _local_config = _config.get("local", {})
+        _scan_paths = self._library_paths(_local_config)
 
         self._scan_progress = {
             "processed": 0,
             "inserted": 0,
             "updated": 0,
+            "removed": 0,
             "completed": False,
         }
         self._core.send(
@@ -664,114 +1199,43 @@ class LocalExtension(SourceActor):
             event="scan_update",
             progress=self._scan_progress.copy(),
         )
-        await asyncio.sleep(0.3)
         logger.info(self._scan_progress)
 
-        for root in _scan_paths:
-            if not os.path.isdir(root):
-                logger.warning(f"Skip non-existent path: {root}")
-                continue
-
-            for dirpath, _, filenames in os.walk(root):
-                for fn in filenames:
-                    if fn.startswith("."):
-                        continue
-
-                    if not self.is_audio(fn):
-                        continue
-
-                    fullpath = os.path.join(dirpath, fn)
-                    try:
-                        mtime = os.path.getmtime(fullpath)
-
-                        # Check if already in DB with same mtime
-                        row = self._db.fetchone(
-                            "SELECT id, mtime FROM track WHERE path = ?",
-                            (fullpath,),
-                        )
-                        if (
-                            row
-                            and row.mtime
-                            and abs(float(row.mtime) - float(mtime)) < 0.0001
-                        ):
-                            logger.debug(f"Skipping unchanged: {fullpath}")
-                            continue
-
-                        cover_path, tags = self._metadata.extract_cover_and_tags(
-                            fullpath
-                        )
-
-                        artist_id = self.get_or_create("artist", "name", tags["artist"])
-                        genre_id = self.get_or_create("genre", "name", tags["genre"])
-                        album_id = self.get_or_create_album(
-                            tags["album"], artist_id, tags["year"], cover_path
-                        )
-
-                        file_name = os.path.basename(fullpath)
-                        logger.debug(f"Processing file:{fullpath}")
-
-                        if not tags["length"]:
-                            continue
-
-                        if row:
-                            self._db.execute(
-                                """UPDATE track SET
-                                    file_name=?, name=?, track_number=?, disc_number=?, length=?, bitrate=?, sample_rate=?,
-                                    album_id=?, artist_id=?, genre_id=?, image=?, mtime=?
-                                WHERE id=?""",
-                                (
-                                    file_name,
-                                    tags["name"],
-                                    tags["track_number"],
-                                    tags["disc_number"],
-                                    tags["length"],
-                                    tags["bitrate"],
-                                    tags["sample_rate"],
-                                    album_id,
-                                    artist_id,
-                                    genre_id,
-                                    cover_path,
-                                    mtime,
-                                    row.id,
-                                ),
-                            )
-                            self._scan_progress["updated"] += 1
-                        else:
-                            self._db.execute(
-                                """INSERT INTO track
-                                    (path, file_name, name, track_number, disc_number, length, bitrate, sample_rate,
-                                    album_id, artist_id, genre_id, image, mtime)
-                                VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)""",
-                                (
-                                    fullpath,
-                                    file_name,
-                                    tags["name"],
-                                    tags["track_number"],
-                                    tags["disc_number"],
-                                    tags["length"],
-                                    tags["bitrate"],
-                                    tags["sample_rate"],
-                                    album_id,
-                                    artist_id,
-                                    genre_id,
-                                    cover_path,
-                                    mtime,
-                                ),
-                            )
-                            self._scan_progress["inserted"] += 1
-                        self._scan_progress["processed"] += 1
-                        if self._scan_progress["processed"] % BATCH_SIZE == 0:
-                            self._core.send(
-                                target=["web", "display"],
-                                event="scan_update",
-                                progress=self._scan_progress.copy(),
-                            )
-                            await asyncio.sleep(0.3)
-                            logger.info(self._scan_progress)
-
-                    except Exception as e:
-                        logger.error(f"Error processing {fullpath}: {e}", exc_info=True)
+        self._scanning = True
+        try:
+            known = {
+                row.path: (row.id, row.mtime)
+                for row in self._db.fetchall("SELECT id, path, mtime FROM track")
+            }
+            scan_dirs = {
+                row.path: (row.mtime, row.entries)
+                for row in self._db.fetchall("SELECT * FROM scan_dir")
+            }
+            workers = worker_count(_local_config.get("scan_workers", 0))
+            scanner = LibraryScanner(
+                self,
+                self._extract_pool(workers),
+                workers=workers,
+                batch_size=BATCH_SIZE,
+                known=known,
+                scan_dirs=scan_dirs,
+                full=full,
+            )
+            session = self._db.ingest_session()
+            self._load_ingest_caches(session)
+            self._session = session
+            await scanner.run(_scan_paths)
+            self.flush_ingest()
+            with session.transaction():
+                self._prune(session, scanner, known)
+        except Exception as e:
+            logger.error(f"Library scan failed: {e}", exc_info=True)
+        finally:
+            self._ingest_pending = []
+            self._session = None
+            self._scanning = False
 
+        self._image_cache.clear()
         self._scan_progress["completed"] = True
         self._core.send(
             target=["web", "display"],
@@ -779,3 +1243,126 @@ class LocalExtension(SourceActor):
             progress=self._scan_progress.copy(),
         )
         logger.info(self._scan_progress)
+
+    def _expand_paths(self, paths: set[str]) -> tuple[list, list]:
+        """Splits changed paths into audio files to ingest and paths that are gone."""
+        files = {}
+        removed = []
+
+        def add_file(fullpath):
+            if os.path.basename(fullpath).startswith("."):
+                return
+            if not self.is_audio(fullpath):
+                return
+            try:
+                files[fullpath] = os.path.getmtime(fullpath)
+            except OSError:
+                pass
+
+        for path in paths:
+            if os.path.isdir(path):
+                for dirpath, _, filenames in os.walk(path):
+                    for fn in filenames:
+                        add_file(os.path.join(dirpath, fn))
+            elif os.path.isfile(path):
+                add_file(path)
+            elif not os.path.exists(path):
+                removed.append(path)
+
+        return list(files.items()), removed
+
+    def _extract_pool(self, workers: int):
+        """Tag extraction pool shared by scans and watcher updates."""
+        if self._pool is not None and self._pool_workers != workers:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        if self._pool is None:
+            self._pool = create_pool(workers)
+            self._pool_workers = workers
+        return self._pool
+
+    def _known_tracks(self, paths: set[str]) -> dict:
+        """{path: (id, mtime)} of the stored tracks at or under `paths`."""
+        known = {}
+        for path in paths:
+            prefix = os.path.join(path, "")
+            # Range on the path index, "0" sorts right after the separator
+            rows = self._db.fetchall(
+                """
+                SELECT id, path, mtime FROM track
+                WHERE path = ? OR (path > ? AND path < ?)
+                """,
+                (path, prefix, prefix[:-1] + chr(ord(os.sep) + 1)),
+            )
+            for row in rows:
+                known[row.path] = (row.id, row.mtime)
+        return known
+
+    async def ingest_paths(self, paths: set[str]) -> bool:
+        """
+        Ingests only the given files or directories, removing the ones that no
+        longer exist. Returns False when a scan is already running.
+        """
+        if self._scanning:
+            return False
+
+        self._scanning = True
+        try:
+            files, removed = await asyncio.to_thread(self._expand_paths, paths)
+            if not files and not removed:
+                return True
+
+            self._scan_progress = {
+                "processed": 0,
+                "inserted": 0,
+                "updated": 0,
+                "removed": 0,
+                "completed": False,
+            }
+            known = self._known_tracks(paths)
+
+            session = self._db.ingest_session()
+            self._load_ingest_caches(session)
+            self._session = session
+
+            with session.transaction():
+                for path in removed:
+                    prefix = os.path.join(path, "")
+                    params = (path, len(prefix), prefix)
+                    cur = session.execute(
+                        "DELETE FROM track WHERE path = ? OR substr(path, 1, ?) = ?",
+                        params,
+                    )
+                    self._scan_progress["removed"] += cur.rowcount
+                    session.execute(
+                        "DELETE FROM scan_dir WHERE path = ? OR substr(path, 1, ?) = ?",
+                        params,
+                    )
+                if self._scan_progress["removed"]:
+                    self._prune_orphans(session)
+
+            _local_config = self._db.get_config().get(self._name, {})
+            workers = worker_count(_local_config.get("scan_workers", 0))
+            scanner = LibraryScanner(
+                self,
+                self._extract_pool(workers),
+                workers=workers,
+                batch_size=BATCH_SIZE,
+                known=known,
+            )
+            await scanner.run_files(files)
+            self.flush_ingest()
+        finally:
+            self._ingest_pending = []
+            self._session = None
+            self._scanning = False
+
+        self._image_cache.clear()
+        self._scan_progress["completed"] = True
+        self._core.send(
+            target=["web", "display"],
+            event="scan_update",
+            progress=self._scan_progress.copy(),
+        )
+        logger.info(f"Library updated {self._scan_progress}")
+        return True
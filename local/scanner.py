@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from core.util.metadata import Metadata
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE_PER_WORKER = 8
+
+_worker_metadata = None
+
+
+def worker_count(workers: int = 0) -> int:
+    return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+
+def create_pool(workers: int) -> ProcessPoolExecutor:
+    # Forking this process would copy locks held by the GLib, GStreamer
+    # and database threads into the workers, start them from a clean one
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("forkserver"),
+    )
+
+
+def extract_file(fullpath: str, cover_dir: str):
+    """Runs inside a pool worker, returns (cover_path, tags) for a single file."""
+    global _worker_metadata
+    if _worker_metadata is None or _worker_metadata.cover_dir != cover_dir:
+        _worker_metadata = Metadata(cover_dir=cover_dir)
+    return _worker_metadata.extract_cover_and_tags(fullpath)
+
+
+class LibraryScanner:
+    """
+    Library scan pipeline:
+      - a directory walk producer running in a thread, or a list of files
+      - the extension's process pool of tag extractors
+      - a single writer coroutine ingesting results into the database in batches
+
+    `known` maps stored track paths to (id, mtime) and `scan_dirs` maps
+    directories to the (mtime, entries) recorded by the previous scan. Files
+    in a directory whose mtime and entry count are unchanged are not stat'ed
+    again unless `full` is set, only the ones without a stored track (new or
+    failed before) are. After `run`, `seen` holds every track path still on
+    disk and `dirs` the directory index to persist.
+    """
+
+    def __init__(
+        self,
+        ext,
+        pool: ProcessPoolExecutor,
+        workers: int = 0,
+        batch_size: int = 50,
+        known: dict | None = None,
+        scan_dirs: dict | None = None,
+        full: bool = False,
+    ):
+        self._ext = ext
+        self._pool = pool
+        self._workers = worker_count(workers)
+        self._batch_size = batch_size
+        self._known = known or {}
+        self._scan_dirs = scan_dirs or {}
+        self._full = full
+        self._loop = None
+        self.roots = []
+        self.seen = set()
+        self.dirs = {}
+
+    async def run(self, roots: list[str]):
+        """Walks `roots` and ingests new and changed files."""
+        logger.info(f"Scanning with {self._workers} workers")
+        await self._pipeline(lambda paths: asyncio.to_thread(self._walk, roots, paths))
+
+    async def run_files(self, files: list[tuple[str, float]]):
+        """Ingests the given (path, mtime) files unless stored with the same mtime."""
+
+        async def produce(paths: asyncio.Queue):
+            for fullpath, mtime in files:
+                self.seen.add(fullpath)
+                item = self._changed(fullpath, mtime)
+                if item is not None:
+                    await paths.put(item)
+
+        await self._pipeline(produce)
+
+    async def _pipeline(self, produce):
+        self._loop = asyncio.get_running_loop()
+        paths = asyncio.Queue(maxsize=self._workers * QUEUE_SIZE_PER_WORKER)
+        results = asyncio.Queue(maxsize=self._workers * QUEUE_SIZE_PER_WORKER)
+
+        extractors = [
+            asyncio.create_task(self._extract(self._pool, paths, results))
+            for _ in range(self._workers)
+        ]
+        writer = asyncio.create_task(self._write(results))
+        try:
+            await produce(paths)
+        finally:
+            for _ in extractors:
+                await paths.put(None)
+            await asyncio.gather(*extractors, return_exceptions=True)
+            await results.put(None)
+            await writer
+
+    def _put(self, queue: asyncio.Queue, item):
+        """Blocking put from the walker thread, keeps the queue bounded."""
+        asyncio.run_coroutine_threadsafe(queue.put(item), self._loop).result()
+
+    def _walk(self, roots: list[str], paths: asyncio.Queue):
+        known_by_dir = defaultdict(list)
+        for path in self._known:
+            known_by_dir[os.path.dirname(path)].append(path)
+
+        for root in roots:
+            root = os.path.normpath(root)
+            if not os.path.isdir(root):
+                logger.warning(f"Skip non-existent path: {root}")
+                continue
+            self.roots.append(root)
+
+            stack = [root]
+            while stack:
+                dirpath = stack.pop()
+                try:
+                    mtime = os.stat(dirpath).st_mtime
+                    with os.scandir(dirpath) as it:
+                        entries = list(it)
+                except OSError as e:
+                    # Keep what we already know rather than pruning it
+                    logger.warning(f"Cannot read {dirpath}: {e}")
+                    prefix = os.path.join(dirpath, "")
+                    self.seen.update(p for p in self._known if p.startswith(prefix))
+                    continue
+
+                files = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif not entry.name.startswith(".") and self._ext.is_audio(
+                            entry.name
+                        ):
+                            files.append(entry)
+                    except OSError:
+                        continue
+
+                state = (mtime, len(entries))
+                self.dirs[dirpath] = state
+
+                if not self._full and self._scan_dirs.get(dirpath) == state:
+                    # Nothing added or removed, trust the stored tracks. A file
+                    # rewritten in place leaves its directory's mtime alone, so
+                    # such edits are only picked up by a full=True scan.
+                    self.seen.update(known_by_dir.get(dirpath, ()))
+                    files = [entry for entry in files if entry.path not in self._known]
+
+                for entry in files:
+                    self._check_file(entry, paths)
+
+    def _check_file(self, entry, paths: asyncio.Queue):
+        try:
+            mtime = entry.stat().st_mtime
+        except OSError as e:
+            logger.warning(f"Cannot stat {entry.path}: {e}")
+            return
+
+        self.seen.add(entry.path)
+        item = self._changed(entry.path, mtime)
+        if item is not None:
+            self._put(paths, item)
+
+    def _changed(self, fullpath: str, mtime: float) -> tuple | None:
+        """The (path, mtime, track_id) to extract, None when stored with this mtime."""
+        track_id, known_mtime = self._known.get(fullpath, (None, None))
+        if known_mtime and abs(float(known_mtime) - float(mtime)) < 0.0001:
+            logger.debug(f"Skipping unchanged: {fullpath}")
+            return None
+        return (fullpath, mtime, track_id)
+
+    async def _extract(self, pool, paths: asyncio.Queue, results: asyncio.Queue):
+        cover_dir = self._ext._metadata.cover_dir
+        while True:
+            item = await paths.get()
+            if item is None:
+                return
+
+            fullpath, mtime, track_id = item
+            try:
+                cover_path, tags = await self._loop.run_in_executor(
+                    pool, extract_file, fullpath, cover_dir
+                )
+                await results.put((fullpath, mtime, track_id, cover_path, tags))
+            except Exception as e:
+                logger.error(f"Error processing {fullpath}: {e}", exc_info=True)
+
+    async def _write(self, results: asyncio.Queue):
+        batch = []
+        while True:
+            item = await results.get()
+            if item is not None:
+                batch.append(item)
+
+            if batch and (
+                item is None or len(batch) >= self._batch_size or results.empty()
+            ):
+                self._ext.ingest_batch(batch)
+                batch = []
+                await asyncio.sleep(0)
+
+            if item is None:
+                return
@@ -0,0 +1,244 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+WATCH_MASK = (
+    IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+class Inotify:
+    """Minimal inotify binding over libc, the fd is non-blocking."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+        self._libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+
+    def rm_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Yields (wd, mask, cookie, name) for all pending events."""
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            yield wd, mask, cookie, os.fsdecode(name)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class LibraryWatcher:
+    """
+    Watches library roots recursively and reports changed paths after
+    `debounce` seconds without new events. Bursts of events for the same path
+    are coalesced into a single entry.
+    """
+
+    def __init__(
+        self, roots: list[str], on_changes, on_overflow, debounce: float = 2.0
+    ):
+        self._roots = [os.path.normpath(root) for root in roots]
+        self._on_changes = on_changes
+        self._on_overflow = on_overflow
+        self._debounce = debounce
+        self._inotify = None
+        self._loop = None
+        self._watches = {}
+        # Directories moved away by cookie, until the matching IN_MOVED_TO
+        self._moved_from = {}
+        self._pending = set()
+        self._timer = None
+        self._task = None
+        self._overflow_task = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._inotify = Inotify()
+        for root in self._roots:
+            if os.path.isdir(root):
+                self._watch_tree(root)
+            else:
+                logger.warning(f"Cannot watch non-existent path: {root}")
+        self._loop.add_reader(self._inotify.fd, self._read)
+        logger.info(f"Watching {len(self._watches)} directories")
+
+    async def stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._inotify:
+            self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+        self._moved_from.clear()
+        self._pending.clear()
+
+        # Nothing may reach the library once stopped
+        for task in (self._task, self._overflow_task):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._overflow_task = None
+
+    def _watch_tree(self, root: str):
+        for dirpath, _, _ in os.walk(root):
+            try:
+                wd = self._inotify.add_watch(dirpath, WATCH_MASK)
+                self._watches[wd] = dirpath
+            except OSError as e:
+                logger.warning(f"Cannot watch {dirpath}: {e}")
+
+    def _subtree(self, root: str) -> list[tuple[int, str]]:
+        prefix = os.path.join(root, "")
+        return [
+            (wd, path)
+            for wd, path in self._watches.items()
+            if path == root or path.startswith(prefix)
+        ]
+
+    def _rename_tree(self, old: str, new: str):
+        """Points the watches of a directory renamed inside the tree at its new path."""
+        for wd, path in self._subtree(old):
+            self._watches[wd] = new + path[len(old) :]
+
+    def _unwatch_tree(self, root: str):
+        for wd, _ in self._subtree(root):
+            self._watches.pop(wd, None)
+            self._inotify.rm_watch(wd)
+
+    def _read(self):
+        for wd, mask, cookie, name in self._inotify.read_events():
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflow, requesting a full rescan")
+                self._pending.clear()
+                self._moved_from.clear()
+                if not self._overflow_task or self._overflow_task.done():
+                    self._overflow_task = self._loop.create_task(self._on_overflow())
+                continue
+
+            dirpath = self._watches.get(wd)
+            if dirpath is None:
+                continue
+
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+
+            if mask & IN_DELETE_SELF:
+                self._watches.pop(wd, None)
+                self._pending.add(dirpath)
+                continue
+
+            if mask & IN_MOVE_SELF:
+                # A rename inside the tree already moved the watch to the new
+                # path on IN_MOVED_TO, only a directory moved out of the tree
+                # still maps to the path it was moved from
+                moved = [c for c, path in self._moved_from.items() if path == dirpath]
+                if moved or dirpath in self._roots:
+                    for c in moved:
+                        del self._moved_from[c]
+                    self._unwatch_tree(dirpath)
+                    self._pending.add(dirpath)
+                continue
+
+            path = os.path.join(dirpath, name) if name else dirpath
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                self._moved_from[cookie] = path
+            elif mask & IN_ISDIR and mask & IN_MOVED_TO:
+                old = self._moved_from.pop(cookie, None)
+                if old is not None:
+                    self._rename_tree(old, path)
+                # Same inode keeps the same wd, this adds the new subdirectories
+                self._watch_tree(path)
+            elif mask & IN_ISDIR and mask & IN_CREATE:
+                self._watch_tree(path)
+            elif not mask & IN_ISDIR and mask & IN_CREATE:
+                # Wait for IN_CLOSE_WRITE before reading a new file
+                continue
+
+            self._pending.add(path)
+
+        if self._pending:
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self._debounce, self._flush)
+
+    def _flush(self):
+        self._timer = None
+        if self._task and not self._task.done():
+            # Previous batch still being ingested, try again later
+            self._schedule()
+            return
+
+        paths, self._pending = self._pending, set()
+        self._task = self._loop.create_task(self._deliver(paths))
+
+    async def _deliver(self, paths: set[str]):
+        try:
+            if not await self._on_changes(paths):
+                self._pending |= paths
+                self._schedule()
+        except Exception as e:
+            logger.error(f"Error handling library changes: {e}", exc_info=True)
@@ -34,6 +34,7 @@ async def async_main(verbose=False):
     extensions = [
         "config",
         "system",
+        "metrics",
         "mixer",
         "tracklist",
         "web",
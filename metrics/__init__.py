@@ -0,0 +1 @@
+from .metrics import MetricsExtension as Extension
@@ -0,0 +1,77 @@
+import logging
+
+from core.actor import Actor
+
+from .registry import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsExtension(Actor):
+    """
+    Collects event loop lag, Core.request latency, Core.send fan-out and
+    extension queue depth. Core reports into the registry once it is attached.
+    """
+
+    def __init__(self, name, core, db, config):
+        super().__init__()
+        self._name = name
+        self._core = core
+        self._db = db
+        self._config = config
+        self._registry = MetricsRegistry()
+
+    async def on_start(self):
+        self._core.metrics = self._registry
+        # Core's loop monitor already wakes up periodically, sample on its tick
+        self._core.loop_monitor.observer = self._sample
+        logger.info("Started")
+
+    async def on_stop(self):
+        if self._core.metrics is self._registry:
+            self._core.metrics = None
+        if self._core.loop_monitor.observer == self._sample:
+            self._core.loop_monitor.observer = None
+        logger.info("Stopped")
+
+    async def on_event(self, message):
+        pass
+
+    def _sample(self, lag: float):
+        self._registry.loop_lag.observe(lag)
+        for ext in self._core.extensions:
+            self._registry.set_queue_depth(
+                ext._module_name,
+                ext.queue.qsize(),
+                ext.queue.dropped,
+                ext.queue.coalesced,
+            )
+
+    def _core_metrics(self) -> dict:
+        stats = self._core.stats()
+        return {
+            "loop_stalls_total": ("counter", {"": stats["loop"]["stalls"]}),
+            "loop_stall_seconds_total": (
+                "counter",
+                {"": stats["loop"]["stall_total"]},
+            ),
+            "loop_stall_seconds_max": ("gauge", {"": stats["loop"]["stall_max"]}),
+            "blocking_active": (
+                "gauge",
+                {
+                    f'extension="{name}"': blocking["active"]
+                    for name, blocking in stats["blocking"].items()
+                },
+            ),
+        }
+
+    def on_snapshot(self) -> dict:
+        return {**self._registry.snapshot(), "core": self._core.stats()}
+
+    def on_prometheus(self) -> str:
+        return self._registry.prometheus(self._core_metrics())
+
+    def on_reset(self) -> bool:
+        self._registry = MetricsRegistry()
+        self._core.metrics = self._registry
+        return True
@@ -0,0 +1,192 @@
+import bisect
+import math
+
+from collections import defaultdict
+
+# Upper bounds in seconds, from sub-millisecond handlers to multi-second stalls
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+
+
+class Histogram:
+    """Cumulative bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile."""
+        if not self.count:
+            return 0.0
+        rank = math.ceil(q * self.count)
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+    def prometheus(self, name: str, labels: str = "") -> list[str]:
+        sep = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+def _label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+class MetricsRegistry:
+    """
+    In-process metrics. Core calls `observe_request` and `count_send` on its
+    hot paths, so both only touch dicts and a bisect.
+    """
+
+    def __init__(self):
+        self.loop_lag = Histogram()
+        self.requests = defaultdict(Histogram)
+        self.request_errors = defaultdict(int)
+        self.sends = defaultdict(int)
+        self.send_fanout = defaultdict(int)
+        self.queue_depth = {}
+        self.queue_depth_max = defaultdict(int)
+        self.queue_dropped = {}
+        self.queue_coalesced = {}
+
+    def observe_request(self, method: str, seconds: float, error: bool = False):
+        self.requests[method].observe(seconds)
+        if error:
+            self.request_errors[method] += 1
+
+    def count_send(self, event, fanout: int):
+        event = event or "unknown"
+        self.sends[event] += 1
+        self.send_fanout[event] += fanout
+
+    def set_queue_depth(
+        self, name: str, depth: int, dropped: int = 0, coalesced: int = 0
+    ):
+        self.queue_depth[name] = depth
+        if depth > self.queue_depth_max[name]:
+            self.queue_depth_max[name] = depth
+        self.queue_dropped[name] = dropped
+        self.queue_coalesced[name] = coalesced
+
+    def snapshot(self) -> dict:
+        return {
+            "loop_lag": self.loop_lag.snapshot(),
+            "requests": {
+                method: {**hist.snapshot(), "errors": self.request_errors[method]}
+                for method, hist in sorted(self.requests.items())
+            },
+            "sends": {
+                event: {"count": count, "fanout": self.send_fanout[event]}
+                for event, count in sorted(self.sends.items())
+            },
+            "queues": {
+                name: {
+                    "depth": depth,
+                    "max": self.queue_depth_max[name],
+                    "dropped": self.queue_dropped.get(name, 0),
+                    "coalesced": self.queue_coalesced.get(name, 0),
+                }
+                for name, depth in sorted(self.queue_depth.items())
+            },
+        }
+
+    def prometheus(self, extra: dict | None = None) -> str:
+        lines = [
+            "# HELP berryaudio_loop_lag_seconds Event loop wakeup delay",
+            "# TYPE berryaudio_loop_lag_seconds histogram",
+            *self.loop_lag.prometheus("berryaudio_loop_lag_seconds"),
+            "# HELP berryaudio_request_seconds Core.request latency per method",
+            "# TYPE berryaudio_request_seconds histogram",
+        ]
+        for method, hist in sorted(self.requests.items()):
+            lines += hist.prometheus(
+                "berryaudio_request_seconds", f'method="{_label(method)}"'
+            )
+
+        lines += [
+            "# HELP berryaudio_request_errors_total Core.request calls that raised",
+            "# TYPE berryaudio_request_errors_total counter",
+        ]
+        for method, count in sorted(self.request_errors.items()):
+            lines.append(
+                f'berryaudio_request_errors_total{{method="{_label(method)}"}} {count}'
+            )
+
+        lines += [
+            "# HELP berryaudio_events_total Core.send calls per event",
+            "# TYPE berryaudio_events_total counter",
+        ]
+        for event, count in sorted(self.sends.items()):
+            lines.append(f'berryaudio_events_total{{event="{_label(event)}"}} {count}')
+
+        lines += [
+            "# HELP berryaudio_event_deliveries_total Messages queued by Core.send",
+            "# TYPE berryaudio_event_deliveries_total counter",
+        ]
+        for event, count in sorted(self.send_fanout.items()):
+            lines.append(
+                f'berryaudio_event_deliveries_total{{event="{_label(event)}"}} {count}'
+            )
+
+        lines += [
+            "# HELP berryaudio_queue_depth Pending messages in an extension queue",
+            "# TYPE berryaudio_queue_depth gauge",
+        ]
+        for name, depth in sorted(self.queue_depth.items()):
+            lines.append(f'berryaudio_queue_depth{{extension="{_label(name)}"}} {depth}')
+
+        for metric, values, description in (
+            ("queue_dropped_total", self.queue_dropped, "Messages dropped on overflow"),
+            ("queue_coalesced_total", self.queue_coalesced, "Messages replaced by newer"),
+        ):
+            lines += [
+                f"# HELP berryaudio_{metric} {description}",
+                f"# TYPE berryaudio_{metric} counter",
+            ]
+            for name, count in sorted(values.items()):
+                lines.append(
+                    f'berryaudio_{metric}{{extension="{_label(name)}"}} {count}'
+                )
+
+        # Families owned by Core, {name: (type, {labels: value})}
+        for name, (kind, series) in (extra or {}).items():
+            lines.append(f"# TYPE berryaudio_{name} {kind}")
+            for labels, value in series.items():
+                suffix = f"{{{labels}}}" if labels else ""
+                lines.append(f"berryaudio_{name}{suffix} {value}")
+
+        return "\n".join(lines) + "\n"
@@ -9,7 +9,7 @@ import subprocess
 from pathlib import Path
 from typing import Optional
 
-from core.actor import Actor
+from core.actor import Actor, blocking
 from core.util.system import SystemUtil
 
 
@@ -203,6 +203,7 @@ class MixerExtension(Actor):
         match = re.search(r"CARD=([^,]+)", device_name)
         return match.group(1) if match else None
 
+    @blocking
     def on_alsa_devices(self, cmd: str, filter_loopback: bool = True):
         """Gets ALSA aplay, arecord device list"""
         if cmd not in ("arecord", "aplay"):
@@ -329,6 +330,7 @@ class MixerExtension(Actor):
             controls.append(current)
         return controls
 
+    @blocking
     def on_alsa_mixer_volume(self, device: str = None):
         software_control = {
             "name": "Software",
@@ -0,0 +1,100 @@
+import hashlib
+import logging
+import os
+import threading
+
+from collections import OrderedDict
+from pathlib import Path
+from core.models import Image
+from core.util.metadata import image_size
+
+logger = logging.getLogger(__name__)
+
+NOWPLAYING_DIR = (
+    Path(__file__).resolve().parent.parent / "web" / "www" / "images" / "nowplaying"
+)
+NOWPLAYING_WEB_PATH = Path("images") / "nowplaying"
+# Covers kept on disk, older ones are removed
+NOWPLAYING_KEEP = 16
+
+
+def cover_suffix(data: bytes) -> str:
+    if data.startswith(b"\x89PNG"):
+        return ".png"
+    if data[8:12] == b"WEBP":
+        return ".webp"
+    return ".jpg"
+
+
+class CoverStore:
+    """
+    Embedded now-playing artwork stored under its content hash. A cover seen
+    before is not written again, and its URI only changes with its content so
+    browsers can cache it. `store` does file I/O, call it from a worker thread.
+    """
+
+    def __init__(
+        self,
+        directory: Path = NOWPLAYING_DIR,
+        web_path: Path = NOWPLAYING_WEB_PATH,
+        keep: int = NOWPLAYING_KEEP,
+    ):
+        self._directory = directory
+        self._web_path = web_path
+        self._keep = keep
+        self._lock = threading.Lock()
+        self._covers = OrderedDict()
+
+    def load(self):
+        """Picks up covers stored by a previous run, oldest first."""
+        os.makedirs(self._directory, exist_ok=True)
+        found = []
+        with os.scandir(self._directory) as it:
+            for entry in it:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                found.append((entry.stat().st_mtime, entry.name))
+        with self._lock:
+            for _, name in sorted(found):
+                self._covers[name] = self._image(name)
+            self._evict()
+
+    def store(self, data: bytes) -> Image | None:
+        name = hashlib.blake2b(data, digest_size=12).hexdigest() + cover_suffix(data)
+        path = self._directory / name
+        with self._lock:
+            image = self._covers.get(name)
+            if image is not None:
+                self._covers.move_to_end(name)
+        if image is not None and path.is_file():
+            return image
+
+        tmp = path.with_name(f".{name}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Cannot store cover {name}: {e}")
+            return None
+
+        image = self._image(name)
+        with self._lock:
+            self._covers[name] = image
+            self._evict()
+        return image
+
+    def _image(self, name: str) -> Image:
+        uri = str(self._web_path / name)
+        size = image_size(self._directory / name)
+        if size is None:
+            return Image(uri=uri)
+        return Image(uri=uri, width=size[0], height=size[1])
+
+    def _evict(self):
+        while len(self._covers) > self._keep:
+            name, _ = self._covers.popitem(last=False)
+            try:
+                os.remove(self._directory / name)
+            except OSError:
+                pass
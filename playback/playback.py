@@ -1,14 +1,65 @@
 import logging
 import asyncio
 
-from pathlib import Path
 from gi.repository import GLib, Gst
 from core.actor import Actor
 from core.models import Album, Artist, Track, TlTrack
 from core.types import PlaybackState
 
+from .covers import CoverStore
+from .position import PositionClock
+
 logger = logging.getLogger(__name__)
 
+# playbin3 where available, it switches streams more cleanly on about-to-finish
+PLAYBIN_FACTORIES = ("playbin3", "playbin")
+PLAY_FLAG_AUDIO = 1 << 1
+POSITION_MIN_INTERVAL_MS = 100
+# Tracklist events after which the prerolled next track may be stale
+TRACKLIST_EVENTS = (
+    "tracklist_track_added",
+    "tracklist_track_removed",
+    "tracklist_updated",
+    "tracklist_cleared",
+    "options_changed",
+)
+
+
+def build_playbin(output_device: str | None, sink_factory: str = "alsasink"):
+    """
+    playbin3 (or playbin) playing audio only into an audioconvert !
+    audioresample ! sink chain. Returns the playbin and the chain's sink pad.
+    """
+    playbin = None
+    for factory in PLAYBIN_FACTORIES:
+        playbin = Gst.ElementFactory.make(factory, "audio-player")
+        if playbin is not None:
+            break
+    convert = Gst.ElementFactory.make("audioconvert", "convert")
+    resample = Gst.ElementFactory.make("audioresample", "resample")
+    sink = Gst.ElementFactory.make(sink_factory, "sink")
+
+    resample.set_property("quality", 0)
+
+    sink.set_property("sync", False)
+    if sink_factory == "alsasink":
+        sink.set_property("device", output_device)
+        sink.set_property("buffer-time", 200000)
+
+    sink_bin = Gst.Bin.new("audio-sink")
+    for el in [convert, resample, sink]:
+        sink_bin.add(el)
+
+    convert.link(resample)
+    resample.link(sink)
+
+    sink_pad = Gst.GhostPad.new("sink", convert.get_static_pad("sink"))
+    sink_bin.add_pad(sink_pad)
+
+    playbin.set_property("audio-sink", sink_bin)
+    playbin.set_property("flags", PLAY_FLAG_AUDIO)
+    return playbin, sink_pad
+
 
 class PlaybackExtension(Actor):
     def __init__(self, name, core, db, config):
@@ -20,121 +71,189 @@ class PlaybackExtension(Actor):
         self._output_device = self._config["mixer"].get("output_device")
         self._state = PlaybackState.STOPPED
         self._buffering = False
-        self._pipeline: None
-        self._sink: None
-        self._source: None
-        self._convert: None
-        self._resample: None
+        self._pipeline = None
+        self._bus_handler_id = None
         self._capsfilter = None
         self._setup_resample = False
         self._sample_rate = None
         self._duration = 0
-        self._elapsed = 0
-        self._time_source_id = None
+        self._position = PositionClock()
+        # Extension name to the tick interval it asked for, in ms
+        self._position_subscribers = {}
+        self._position_ticker = None
+        self._covers = CoverStore()
         self._playback_uri = None
         self._playback_ready = False
         self._tl_track = None
         self._loop = asyncio.get_event_loop()
+        self._gapless = self._config.get(self._name, {}).get("gapless", True)
+        # Sample rate the DSP capture device currently runs at
+        self._capture_rate = None
+        # (TlTrack, playback uri) of the next track, queued on about-to-finish
+        self._preroll = None
+        self._gapless_next = None
+        self._gapless_previous = None
+
+    def _setup_playbin(self):
+        """
+        Builds the pipeline once, tracks are switched on it with `_load`. The
+        bus watch lives as long as the pipeline and is removed with it.
+        """
+        self._pipeline, sink_pad = build_playbin(self._output_device)
+        sink_pad.add_probe(Gst.PadProbeType.EVENT_DOWNSTREAM, self._on_sink_event)
+        self._pipeline.connect("about-to-finish", self._on_about_to_finish)
 
-    def _setup_playbin(self, uri: str | None = None):
-        self._pipeline = Gst.Pipeline.new("audio-player")
-        self._source = Gst.ElementFactory.make("uridecodebin", "source")
-        self._convert = Gst.ElementFactory.make("audioconvert", "convert")
-        self._resample = Gst.ElementFactory.make("audioresample", "resample")
-        self._sink = Gst.ElementFactory.make("alsasink", "sink")
+        bus = self._pipeline.get_bus()
+        bus.add_signal_watch()
+        self._bus_handler_id = bus.connect("message", self._on_message)
 
-        self._resample.set_property("quality", 0)
+    def _teardown_playbin(self):
+        if self._pipeline is None:
+            return
+        self._pipeline.set_state(Gst.State.NULL)
+        bus = self._pipeline.get_bus()
+        if self._bus_handler_id is not None:
+            bus.disconnect(self._bus_handler_id)
+            self._bus_handler_id = None
+        bus.remove_signal_watch()
+        self._pipeline = None
+
+    def _load(self, uri: str, state: Gst.State = Gst.State.READY):
+        """
+        Points the pipeline at `uri`. READY keeps the decoders and the ALSA
+        device open between tracks, NULL releases the device as well.
+        """
+        self._pipeline.set_state(state)
+        self._gapless_next = None
+        self._pipeline.set_property("uri", uri)
+
+    def _on_sink_event(self, pad, info):
+        """Streaming thread: stream switches and negotiated format at the sink."""
+        event = info.get_event()
+
+        if event.type == Gst.EventType.STREAM_START:
+            switched, self._gapless_next = self._gapless_next, None
+            if switched:
+                # Promoted here so the caps that follow land on the new track,
+                # the STREAM_START message announces the switch
+                self._gapless_previous = self._tl_track
+                self._tl_track, self._playback_uri = switched
+                self._duration = 0
+                self._position.duration_ms = 0
+                self._position.anchor(0, True, self._pipeline.get_clock())
+            return Gst.PadProbeReturn.OK
+
+        if event.type != Gst.EventType.CAPS:
+            return Gst.PadProbeReturn.OK
+
+        structure = event.parse_caps().get_structure(0)
+        if not structure.has_name("audio/x-raw"):
+            return Gst.PadProbeReturn.OK
+
+        rate = structure.get_int("rate")[1] if structure.has_field("rate") else None
+
+        self._sample_rate = rate
+        channels = (
+            structure.get_int("channels")[1]
+            if structure.has_field("channels")
+            else None
+        )
 
-        self._sink.set_property("device", self._output_device)
-        self._sink.set_property("sync", False)
-        self._sink.set_property("buffer-time", 200000)
+        bit_depth = None
 
-        for el in [self._source, self._convert, self._resample, self._sink]:
-            self._pipeline.add(el)
+        if structure.has_field("width"):
+            bit_depth = structure.get_int("width")[1]
+        elif structure.has_field("depth"):
+            bit_depth = structure.get_int("depth")[1]
+        elif structure.has_field("format"):
+            bit_depth = structure.get_string("format")
 
-        self._convert.link(self._resample)
-        self._resample.link(self._sink)
+        if self._tl_track:
+            track = self._tl_track.track.copy(
+                update={
+                    "sample_rate": rate,
+                    "channels": channels,
+                    "bit_depth": bit_depth,
+                }
+            )
+            self._tl_track = TlTrack(tlid=self._tl_track.tlid, track=track)
+            self._core.send(
+                target=["web", "display"],
+                event="track_meta_updated",
+                tl_track=self._tl_track,
+            )
 
-        self._source.connect("pad-added", self._on_pad_added)
+        if self._playback_ready and self._capture_rate and rate != self._capture_rate:
+            # Gapless switch to a track at another rate, the DSP has to follow
+            self._loop.call_soon_threadsafe(self._configure_dsp)
 
-        bus = self._pipeline.get_bus()
-        bus.add_signal_watch()
-        bus.connect("message", self._on_message)
+        return Gst.PadProbeReturn.OK
 
-        if uri:
-            self._source.set_property("uri", uri)
-        elif self._playback_uri:
-            self._source.set_property("uri", self._playback_uri)
+    def _on_about_to_finish(self, playbin):
+        """Streaming thread: queue the prerolled next track for a gapless switch."""
+        preroll, self._preroll = self._preroll, None
+        if preroll is None:
+            # Nothing queued, play out to EOS and advance the usual way
+            return
+        playbin.set_property("uri", preroll[1])
+        self._gapless_next = preroll
 
-    def _on_pad_added(self, decodebin, pad):
-        caps = pad.query_caps(None)
-        if not caps or caps.is_empty():
+    def _on_gapless_switch(self, previous: TlTrack):
+        self._core.send(
+            target=["web", "display"],
+            event="track_playback_ended",
+            tl_track=previous,
+            time_position=previous.track.length or 0,
+        )
+        self._core._request("collection.recently_played", track=self._tl_track.track)
+
+    async def _prepare_next(self):
+        """Looks up the next track so about-to-finish can queue it without a gap."""
+        self._preroll = None
+        tl_track = self._tl_track
+        if not self._gapless or not tl_track or not self._playback_uri:
             return
-        name = caps.get_structure(0).get_name()
-        if not name.startswith("audio/"):
+
+        next_tl_track = await self._core.request("tracklist.next_track")
+        if next_tl_track is None:
+            return
+
+        ext, path = next_tl_track.track.uri.split(":", 1)
+        if ext != tl_track.track.uri.split(":", 1)[0]:
+            # Another source has to be activated first, not gapless
             return
 
-        sink_pad = self._convert.get_static_pad("sink")
-        if sink_pad.is_linked():
+        playback_uri = await self._core.request(f"{ext}.playback_uri", path=path)
+        if not playback_uri or playback_uri == ext:
             return
+        if self._tl_track is tl_track and self._playback_ready:
+            # Still the same track playing, nothing stopped or skipped meanwhile
+            self._preroll = (next_tl_track, playback_uri)
+
+    def _configure_dsp(self):
+        self._capture_rate = self._sample_rate
+        asyncio.run_coroutine_threadsafe(
+            self._core.request("dsp.set_capture_device", samplerate=self._sample_rate),
+            self._loop,
+        )
+
+    def _on_started(self):
+        self._anchor_position(self._position.now(), True)
 
-        ret = pad.link(sink_pad)
-        if ret != Gst.PadLinkReturn.OK:
-            logger.error(f"Pad link failed: {ret}")
-
-        def probe(pad, info):
-            caps = pad.get_current_caps()
-            if not caps:
-                return Gst.PadProbeReturn.OK
-            structure = caps.get_structure(0)
-
-            if structure.has_name("audio/x-raw"):
-                rate = (
-                    structure.get_int("rate")[1]
-                    if structure.has_field("rate")
-                    else None
-                )
-
-                self._sample_rate = rate
-                channels = (
-                    structure.get_int("channels")[1]
-                    if structure.has_field("channels")
-                    else None
-                )
-
-                bit_depth = None
-
-                if structure.has_field("width"):
-                    bit_depth = structure.get_int("width")[1]
-                elif structure.has_field("depth"):
-                    bit_depth = structure.get_int("depth")[1]
-                elif structure.has_field("format"):
-                    bit_depth = structure.get_string("format")
-
-                if self._tl_track:
-                    track = self._tl_track.track.copy(
-                        update={
-                            "sample_rate": rate,
-                            "channels": channels,
-                            "bit_depth": bit_depth,
-                        }
-                    )
-                    self._tl_track = TlTrack(tlid=self._tl_track.tlid, track=track)
-                    self._core.send(
-                        target=["web", "display"],
-                        event="track_meta_updated",
-                        tl_track=self._tl_track,
-                    )
-
-            return Gst.PadProbeReturn.REMOVE
-
-        pad.add_probe(Gst.PadProbeType.BUFFER, probe)
+        self._core.send(
+            target=["web", "display"],
+            event="track_playback_started",
+            tl_track=self._tl_track,
+            time_position=self._position.position_ms,
+        )
+        asyncio.run_coroutine_threadsafe(self._prepare_next(), self._loop)
 
     def _on_message(self, bus, message):
         t = message.type
 
         if t == Gst.MessageType.TAG:
             tags = message.parse_tag()
+            track = self._tl_track.track if self._tl_track else None
             updates = {}
 
             for i in range(tags.n_tags()):
@@ -143,64 +262,47 @@ class PlaybackExtension(Actor):
                     value = tags.get_value_index(tag_name, j)
 
                     if isinstance(value, Gst.Sample):
-                        buf = value.get_buffer()
-                        result, mapinfo = buf.map(Gst.MapFlags.READ)
-                        if result:
-                            BASE_DIR = Path(__file__).resolve().parent.parent
-                            cover_path = (
-                                BASE_DIR
-                                / "web"
-                                / "www"
-                                / "images"
-                                / "nowplaying"
-                                / "cover.jpg"
-                            )
-                            with open(cover_path, "wb") as f:
-                                f.write(mapinfo.data)
-                            buf.unmap(mapinfo)
-                            # print("Cover art saved as cover.jpg")
+                        if track is not None:
+                            buf = value.get_buffer()
+                            result, mapinfo = buf.map(Gst.MapFlags.READ)
+                            if result:
+                                data = bytes(mapinfo.data)
+                                buf.unmap(mapinfo)
+                                asyncio.run_coroutine_threadsafe(
+                                    self._store_cover(data, track.uri), self._loop
+                                )
+                        continue
+                    self._buffering = False
+                    if track is None:
                         continue
                     if tag_name == "audio-codec":
                         updates["audio_codec"] = value
                     elif tag_name == "nominal-bitrate":
                         updates["bitrate"] = value
-                    elif tag_name == "bitrate" and not getattr(
-                        self._tl_track, "bitrate", None
-                    ):
+                    elif tag_name == "bitrate" and not track.bitrate:
+                        # Only without a nominal one, VBR streams vary on every tag
                         updates["bitrate"] = round(value / 1000) * 1000
                     elif tag_name == "title":
                         name = value.strip()
                         if name:
                             updates["name"] = name
-                        elif self._tl_track.track.name:
-                            updates["name"] = self._tl_track.track.name
                     elif tag_name == "album":
-                        updates["albums"] = frozenset([Album(name=value)])
+                        if {album.name for album in track.albums} != {value}:
+                            updates["albums"] = frozenset([Album(name=value)])
                     elif tag_name == "artist":
-                        updates["artists"] = frozenset([Artist(name=value)])
+                        if {artist.name for artist in track.artists} != {value}:
+                            updates["artists"] = frozenset([Artist(name=value)])
                     elif tag_name == "genre":
                         updates["genre"] = value
-                    self._buffering = False
 
             if updates:
-                updated_track = self._tl_track.track.copy(update=updates)
-                tl_track = TlTrack(tlid=self._tl_track.tlid, track=updated_track)
-
-                def _has_changes(old: TlTrack, new: TlTrack) -> bool:
-                    return old.model_dump_json() != new.model_dump_json()
-
-                if _has_changes(self._tl_track, tl_track):
-                    self._tl_track = tl_track
-                    self._core.send(
-                        target=["web", "display"],
-                        event="track_meta_updated",
-                        tl_track=self._tl_track,
-                    )
+                self._update_track(updates)
 
         if t == Gst.MessageType.DURATION_CHANGED:
             success, duration = self._pipeline.query_duration(Gst.Format.TIME)
             if success and duration > 0:
                 self._duration = int(duration / Gst.SECOND) * 1000
+                self._position.duration_ms = self._duration
                 _track = self._tl_track.track.copy(update={"length": self._duration})
                 self._tl_track = TlTrack(tlid=self._tl_track.tlid, track=_track)
 
@@ -208,8 +310,12 @@ class PlaybackExtension(Actor):
             percent = message.parse_buffering()
             if percent < 100:
                 self._pipeline.set_state(Gst.State.PAUSED)
+                if self._position.playing:
+                    self._anchor_position(self._position.now(), False)
             else:
                 self._pipeline.set_state(Gst.State.PLAYING)
+                if self._state == PlaybackState.PLAYING and not self._position.playing:
+                    self._anchor_position(self._position.now(), True)
 
             self._core.send(
                 target=["web", "display"], event="playback_buffering", percent=percent
@@ -217,13 +323,15 @@ class PlaybackExtension(Actor):
 
         elif t == Gst.MessageType.ASYNC_DONE:
             if not self._playback_ready:
-                asyncio.run_coroutine_threadsafe(
-                    self._core.request(
-                        "dsp.set_capture_device", samplerate=self._sample_rate
-                    ),
-                    self._loop,
-                )
                 self._playback_ready = True
+                if self._sample_rate and self._sample_rate == self._capture_rate:
+                    # The DSP already captures at this rate, skip the reload
+                    # and the pipeline rebuild that follows it
+                    self._play()
+                    self._on_started()
+                    self._now_playing()
+                else:
+                    self._configure_dsp()
 
         elif t == Gst.MessageType.EOS:
             self.on_stop()
@@ -281,30 +389,95 @@ class PlaybackExtension(Actor):
             self.on_stop()
 
         elif t == Gst.MessageType.STREAM_START:
+            previous, self._gapless_previous = self._gapless_previous, None
+            if previous is not None:
+                self._on_gapless_switch(previous)
             if self._playback_ready:
-                self._start_time_tracking()
-
-                self._core.send(
-                    target=["web", "display"],
-                    event="track_playback_started",
-                    tl_track=self._tl_track,
-                    time_position=self._elapsed,
-                )
+                self._on_started()
 
-    def _start_time_tracking(self):
-        if self._time_source_id:
-            GLib.source_remove(self._time_source_id)
+    def _update_track(self, updates: dict):
+        """Applies and broadcasts the fields of `updates` that differ from the track."""
+        track = self._tl_track.track
+        # ICY streams repeat their tags constantly, most carry nothing new
+        changes = {
+            field: value
+            for field, value in updates.items()
+            if getattr(track, field) != value
+        }
+        if not changes:
+            return
+        self._tl_track = TlTrack(
+            tlid=self._tl_track.tlid, track=track.copy(update=changes)
+        )
+        self._core.send(
+            target=["web", "display"],
+            event="track_meta_changed",
+            tlid=self._tl_track.tlid,
+            uri=track.uri,
+            changes=changes,
+        )
+        # The full track as well, for clients that do not apply deltas
+        self._core.send(
+            target=["web"],
+            event="track_meta_updated",
+            tl_track=self._tl_track,
+        )
 
-        def update_elapsed():
-            if self._pipeline:
-                success, position = self._pipeline.query_position(Gst.Format.TIME)
-                if success:
-                    self._elapsed = int((position / Gst.SECOND) * 1000)
-            return True
+    async def _store_cover(self, data: bytes, uri: str):
+        """Stores embedded artwork off the loop and points the track's images at it."""
+        image = await asyncio.to_thread(self._covers.store, data)
+        if image is None or not self._tl_track or self._tl_track.track.uri != uri:
+            return
+        self._update_track({"images": (image,)})
 
-        self._time_source_id = GLib.timeout_add(500, update_elapsed)
+    def _pipeline_position(self) -> int:
+        """Position queried from the pipeline, the clock's estimate if it has none."""
+        if self._pipeline is not None:
+            success, position = self._pipeline.query_position(Gst.Format.TIME)
+            if success:
+                return position // Gst.MSECOND
+        return self._position.now()
+
+    def _anchor_position(
+        self, position_ms: int, playing: bool, pipeline_clock: bool = True
+    ):
+        """
+        Re-anchors the position and publishes it. Sent on state changes only,
+        in between clients extrapolate from `position_ms` and `wallclock`.
+        Sources playing outside the pipeline pass `pipeline_clock=False`.
+        """
+        clock = None
+        if pipeline_clock and playing and self._pipeline:
+            clock = self._pipeline.get_clock()
+        self._position.anchor(position_ms, playing, clock)
+        self._core.send(
+            target=["web", "display"],
+            event="track_position_updated",
+            **self._position.snapshot(),
+        )
+        self._loop.call_soon_threadsafe(self._update_position_ticker)
+
+    def _update_position_ticker(self):
+        active = bool(self._position_subscribers) and self._position.playing
+        if active:
+            if self._position_ticker is None or self._position_ticker.done():
+                self._position_ticker = asyncio.create_task(self._tick_position())
+        elif self._position_ticker is not None:
+            self._position_ticker.cancel()
+            self._position_ticker = None
+
+    async def _tick_position(self):
+        """Periodic updates at the fastest rate any subscriber asked for."""
+        while self._position_subscribers and self._position.playing:
+            await asyncio.sleep(min(self._position_subscribers.values()) / 1000)
+            self._core.send(
+                target=list(self._position_subscribers),
+                event="track_position_updated",
+                **self._position.snapshot(),
+            )
 
     async def on_start(self):
+        await asyncio.to_thread(self._covers.load)
         self._setup_playbin()
         logger.info("Started")
 
@@ -316,13 +489,16 @@ class PlaybackExtension(Actor):
     async def on_event(self, message):
         event = message.get("event")
 
+        if event == "dsp_options_changed":
+            self._capture_rate = message.get("capture_sample_rate")
+        elif event == "dsp_options_error":
+            self._capture_rate = None
+
         if event == "dsp_options_changed" or event == "dsp_options_error":
             if self._playback_ready:
-                if self._pipeline is not None:
-                    self._pipeline.set_state(Gst.State.NULL)
-                    await self.on_set_time_position(0)
-
-                self._setup_playbin(uri=self._playback_uri)
+                await self.on_set_time_position(0)
+                # Through NULL so the sink reopens the device on the reloaded DSP
+                self._load(self._playback_uri, Gst.State.NULL)
                 self._play()
                 self._now_playing()
 
@@ -330,6 +506,11 @@ class PlaybackExtension(Actor):
             if not message["tl_tracks"]:
                 self._tl_track = TlTrack(tlid=0, track=self._tl_track.track.copy())
 
+        if event in TRACKLIST_EVENTS:
+            # The queued next track may have moved or gone
+            if self._playback_ready:
+                await self._prepare_next()
+
     async def on_get_current_tl_track(self):
         if self._tl_track:
             row = self._db.fetchone(
@@ -347,18 +528,42 @@ class PlaybackExtension(Actor):
         self._core.send(
             target=["web", "display"], event="playback_state_changed", state=self._state
         )
+        # Sources playing outside the pipeline do not always follow up with
+        # set_time_position, resume or freeze the clock where it is now
+        self._anchor_position(
+            self._position.now(), state == PlaybackState.PLAYING, pipeline_clock=False
+        )
 
     def on_get_time_position(self) -> int:
-        return self._elapsed
+        return self._position.now()
+
+    def on_get_position(self) -> dict:
+        """Position anchor: `position_ms` at `wallclock` (ms since the epoch)."""
+        return self._position.snapshot()
 
     async def on_set_time_position(self, position_ms: int):
-        self._elapsed = position_ms
-        self._core.send(
-            target=["web", "display"],
-            event="track_position_updated",
-            time_position=position_ms,
+        self._anchor_position(
+            position_ms,
+            self._state == PlaybackState.PLAYING,
+            pipeline_clock=self._playback_ready,
         )
 
+    def on_subscribe_position(self, subscriber: str, interval_ms: int = 1000) -> bool:
+        """
+        Sends the `subscriber` extension track_position_updated every
+        `interval_ms` while playing. Others only get updates on state changes.
+        """
+        if interval_ms < POSITION_MIN_INTERVAL_MS:
+            raise ValueError(f"interval_ms must be at least {POSITION_MIN_INTERVAL_MS}")
+        self._position_subscribers[subscriber] = interval_ms
+        self._update_position_ticker()
+        return True
+
+    def on_unsubscribe_position(self, subscriber: str) -> bool:
+        self._position_subscribers.pop(subscriber, None)
+        self._update_position_ticker()
+        return True
+
     def on_set_metadata(self, track: Track | None = None) -> bool:
         if track is None:
             self._tl_track = None
@@ -380,7 +585,8 @@ class PlaybackExtension(Actor):
             except ValueError:
                 raise ValueError(f"Invalid uri format: {uri}")
 
-            self.on_stop()
+            # READY rather than NULL, the next track reuses the open pipeline
+            self._stop(Gst.State.READY)
             await self._core.request("source.set", uri=ext)
 
             track = await self._core.request(f"{ext}.lookup_track", path=path)
@@ -398,11 +604,13 @@ class PlaybackExtension(Actor):
                 raise ValueError("Playback uri not found")
 
             if self._playback_uri == ext:
+                # The source plays by itself, release the device to it
+                self._pipeline.set_state(Gst.State.NULL)
                 return True
 
             self._sample_rate = None
             self._playback_ready = False
-            self._setup_playbin(uri=self._playback_uri)
+            self._load(self._playback_uri)
 
         if self._state == PlaybackState.STOPPED:
             self._pipeline.set_state(Gst.State.PAUSED)
@@ -431,12 +639,7 @@ class PlaybackExtension(Actor):
                 Gst.SeekType.NONE,
                 -1,
             )
-            self._elapsed = time_position
-            self._core.send(
-                target=["web", "display"],
-                event="track_position_updated",
-                time_position=time_position,
-            )
+            self._anchor_position(time_position, self._state == PlaybackState.PLAYING)
             if success:
                 return True
             else:
@@ -469,13 +672,13 @@ class PlaybackExtension(Actor):
 
         self._pipeline.set_state(Gst.State.PLAYING)
         self._state = PlaybackState.PLAYING
-        self._start_time_tracking()
+        self._anchor_position(self._position.now(), True)
 
         self._core.send(
             target=["web", "display", "tracklist"],
             event="track_playback_resumed",
             tl_track=self._tl_track,
-            time_position=self._elapsed,
+            time_position=self._position.position_ms,
         )
 
         self._core.send(
@@ -490,19 +693,16 @@ class PlaybackExtension(Actor):
         if self._pipeline is None:
             return self._state
 
+        position = self._pipeline_position()
         self._pipeline.set_state(Gst.State.PAUSED)
-
-        if self._time_source_id is not None:
-            GLib.source_remove(self._time_source_id)
-            self._time_source_id = None
-
         self._state = PlaybackState.PAUSED
+        self._anchor_position(position, False)
 
         self._core.send(
             target=["web", "display"],
             event="track_playback_paused",
             tl_track=self._tl_track,
-            time_position=self._elapsed,
+            time_position=self._position.position_ms,
         )
         self._core.send(
             target=["web", "display"],
@@ -512,26 +712,34 @@ class PlaybackExtension(Actor):
 
         return self._state
 
+    async def stop(self):
+        self._position_subscribers.clear()
+        self._update_position_ticker()
+        self._teardown_playbin()
+        await super().stop()
+
     def on_stop(self) -> PlaybackState:
+        return self._stop(Gst.State.NULL)
+
+    def _stop(self, pipeline_state: Gst.State) -> PlaybackState:
+        self._preroll = None
+        self._gapless_next = None
+        self._gapless_previous = None
         if self._pipeline is not None:
-            self._pipeline.set_state(Gst.State.NULL)
+            self._pipeline.set_state(pipeline_state)
 
         if self._state not in (PlaybackState.PLAYING, PlaybackState.PAUSED):
             return self._state
 
-        if self._time_source_id is not None:
-            GLib.source_remove(self._time_source_id)
-            self._time_source_id = None
-
         self._state = PlaybackState.STOPPED
         self._playback_ready = False
-        self._elapsed = 0
+        self._anchor_position(0, False)
 
         self._core.send(
             target=["web", "display"],
             event="track_playback_ended",
             tl_track=self._tl_track,
-            time_position=self._elapsed,
+            time_position=self._position.position_ms,
         )
 
         self._core.send(
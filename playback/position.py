@@ -0,0 +1,51 @@
+import time
+
+
+class PositionClock:
+    """
+    Playback position kept as an anchor, `position_ms` at a clock reading,
+    advancing while `playing`. Reading it computes the position on demand
+    rather than polling the pipeline.
+
+    `clock` is the pipeline's GstClock while playing, positions then follow
+    the audio clock. Without one the monotonic clock is used.
+    """
+
+    def __init__(self):
+        self.position_ms = 0
+        self.playing = False
+        self.duration_ms = 0
+        self._clock = None
+        self._anchor_ns = time.monotonic_ns()
+
+    def _now_ns(self) -> int:
+        if self._clock is not None:
+            return self._clock.get_time()
+        return time.monotonic_ns()
+
+    def anchor(self, position_ms: int, playing: bool, clock=None):
+        self._clock = clock
+        self._anchor_ns = self._now_ns()
+        self.position_ms = max(0, int(position_ms))
+        self.playing = playing
+
+    def now(self) -> int:
+        position = self.position_ms
+        if self.playing:
+            position += (self._now_ns() - self._anchor_ns) // 1_000_000
+        if self.duration_ms:
+            position = min(position, self.duration_ms)
+        return position
+
+    def snapshot(self) -> dict:
+        """
+        Position with the wall clock time it was taken at, clients extrapolate
+        from it while `playing` instead of waiting for updates.
+        """
+        position = self.now()
+        return {
+            "time_position": position,
+            "position_ms": position,
+            "wallclock": int(time.time() * 1000),
+            "playing": self.playing,
+        }
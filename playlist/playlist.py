@@ -1,14 +1,17 @@
 import logging
 import json
 
-from core.models import Playlist, TlTrack
-from core.util import generate_tlid
+from core.models import Playlist, TlTrack, Page
+from core.util import generate_tlid, encode_cursor, keyset_clause
 from core.actor import Actor
 from datetime import datetime
 
 from .utils import build_tltrack, to_serialize
 
 logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 100
+
 SQL_QUERY_CREATE =  """
             CREATE TABLE IF NOT EXISTS playlist (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -53,12 +56,14 @@ class PlaylistExtension(Actor):
         uri: str | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        cursor: str | None = None,
     ):
         """
         Browse the playlist directory by URI.
 
         URI formats:
-          - "playlist"              → list all playlists (paginated)
+          - "playlist"              → list all playlists (paginated, pass
+                                      `cursor` for a Page with `next_cursor`)
           - "playlist:{id}"         → fetch a single playlist by id
           - "playlist:{id}:tracks"  → fetch tracks belonging to a playlist
         """
@@ -87,11 +92,33 @@ class PlaylistExtension(Actor):
                 row = self._db.fetchone(f"SELECT * FROM playlist WHERE id = {ref_id}")
                 return Playlist(**self._build_playlist(row))
 
+            case 1 if cursor is not None:
+                limit = limit or PAGE_SIZE
+                clause, params = keyset_clause(
+                    ["last_modified", "id"], cursor, descending=True
+                )
+                rows = self._db.fetchall(
+                    f"""
+                    SELECT * FROM playlist
+                    WHERE {clause}
+                    ORDER BY last_modified DESC, id DESC
+                    LIMIT ?
+                    """,
+                    [*params, limit],
+                )
+                next_cursor = None
+                if len(rows) == limit:
+                    next_cursor = encode_cursor([rows[-1].last_modified, rows[-1].id])
+                return Page(
+                    items=[Playlist(**self._build_playlist(row)) for row in rows],
+                    next_cursor=next_cursor,
+                )
+
             case 1:
                 sql = """
                     SELECT * FROM playlist
                     WHERE 1
-                    ORDER BY last_modified DESC
+                    ORDER BY last_modified DESC, id DESC
                 """
                 params = []
                 if limit is not None:
@@ -2,9 +2,11 @@ import logging
 import json
 
 from pathlib import Path
-from core.actor import SourceActor
-from core.models import Image, Album, Artist, Track, Source
+from core.actor import SourceActor, blocking
+from core.models import Image, Album, Artist, Track, Source, Page
 from core.types import PlaybackControls
+from core.util import encode_cursor, keyset_clause
+from core.util.metadata import image_size
 from pyradios import RadioBrowser
 
 logger = logging.getLogger(__name__)
@@ -12,6 +14,7 @@ logger = logging.getLogger(__name__)
 STATIONS_PATH = Path(__file__).parent.parent / "radio" / "stations.json"
 BASE_DIR = Path(__file__).resolve().parent.parent / "web" / "www"
 ALBUM_IMAGES_WEB_PATH = Path("images") / "radio"
+PAGE_SIZE = 100
 
 SQL_QUERY_SEARCH = {
     "radio": f"""
@@ -61,6 +64,7 @@ class RadioExtension(SourceActor):
         self._config = config
 
         self._rb_instance = None
+        self._image_sizes = {}
         
         self._source = Source(
             name="Radio",
@@ -136,8 +140,13 @@ class RadioExtension(SourceActor):
             image_full_path = BASE_DIR / ALBUM_IMAGES_WEB_PATH / row.image
             image_path = ALBUM_IMAGES_WEB_PATH / row.image
 
+            if image_full_path not in self._image_sizes:
+                self._image_sizes[image_full_path] = image_size(image_full_path)
+            size = self._image_sizes[image_full_path]
             obj["images"] = (
-                [Image(uri=str(image_path))] if image_full_path.is_file() else []
+                [Image(uri=str(image_path), width=size[0], height=size[1])]
+                if size
+                else []
             )
 
         if row.country:
@@ -176,15 +185,32 @@ class RadioExtension(SourceActor):
         )
         return row is not None
 
-    def on_search(self, query: str) -> dict:
+    @blocking
+    def on_search(
+        self, query: str, limit: int | None = None, offset: int | None = None
+    ) -> dict:
         sql = SQL_QUERY_SEARCH["radio"] % "a.name LIKE ? COLLATE NOCASE"
-        rows = self._db.fetchall(sql, (f"%{query}%",))
-        
-        try:
-            rowsBrowser = self.rb.search(name=query)
-        except Exception as e:
-            logger.error(f"Error during RadioBrowser query: {e}")
-            rowsBrowser = []
+        params = [f"%{query}%"]
+        paging = {}
+        if limit is not None or offset is not None:
+            # One list, saved stations first then RadioBrowser, paged as a whole
+            offset = offset or 0
+            local_total = self._db.fetchone(
+                f"SELECT COUNT(*) AS count FROM ({sql})", params
+            )["count"]
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset])
+            paging = {"offset": max(0, offset - local_total)}
+        rows = self._db.fetchall(sql, params)
+
+        if limit is not None:
+            paging["limit"] = limit - len(rows)
+        rowsBrowser = []
+        if paging.get("limit", 1) > 0:
+            try:
+                rowsBrowser = self.rb.search(name=query, **paging)
+            except Exception as e:
+                logger.error(f"Error during RadioBrowser query: {e}")
         
         formattedRows = [Track(**self._build_track(row)) for row in rows]
         formattedRows.extend([Track(**self._build_track_rb(row)) for row in rowsBrowser])
@@ -212,11 +238,13 @@ class RadioExtension(SourceActor):
                 logger.error(f"Error while resolving {path}: {e}")            
         return None
 
+    @blocking
     def on_directory(
         self,
         uri: str | None = None,
         limit: int | None = None,
         offset: int | None = None,
+        cursor: str | None = None,
     ):
         if not uri:
             raise ValueError(f"No 'uri' was defined.")
@@ -224,42 +252,52 @@ class RadioExtension(SourceActor):
         values = uri.split(":")
         values_len = len(values)
 
-        if values_len and values_len == 1:
-            base_sql = (
-                f"""
-                    SELECT 
-                        a.*
-                    FROM radio a
-                    WHERE %s
-                    ORDER BY a.name ASC
-                """
-                % "1"
-            )
-            sql = base_sql.rstrip(";")
-
-            params = []
-            if limit is not None:
-                sql += " LIMIT ?"
-                params.append(limit)
-
-                if offset is not None:
-                    sql += " OFFSET ?"
-                    params.append(offset)
-
-            rows = self._db.fetchall(sql, params)
-
+        where, where_params = "1", []
         if values_len == 2:
             view, ref_id = values
             if str(ref_id).isdigit():
                 raise ValueError("only alphabets allowed")
-            else:
-                rows = self._db.fetchall("""
+            where, where_params = "a.name LIKE ?", [f"{ref_id}%"]
+        elif values_len != 1:
+            raise ValueError(f"Invalid radio uri: {uri}")
+
+        if cursor is not None:
+            limit = limit or PAGE_SIZE
+            clause, params = keyset_clause(["a.name", "a.id"], cursor)
+            rows = self._db.fetchall(
+                f"""
                     SELECT a.*
                     FROM radio a
-                    WHERE a.name LIKE ?
-                    ORDER BY a.name ASC
-                """, (f"{ref_id}%",))
+                    WHERE {where} AND {clause}
+                    ORDER BY a.name ASC, a.id ASC
+                    LIMIT ?
+                """,
+                [*where_params, *params, limit],
+            )
+            next_cursor = None
+            if len(rows) == limit:
+                next_cursor = encode_cursor([rows[-1]["name"], rows[-1]["id"]])
+            return Page(
+                items=[Track(**self._build_track(row)) for row in rows],
+                next_cursor=next_cursor,
+            )
+
+        sql = f"""
+            SELECT a.*
+            FROM radio a
+            WHERE {where}
+            ORDER BY a.name ASC, a.id ASC
+        """
+        params = list(where_params)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+            if offset is not None:
+                sql += " OFFSET ?"
+                params.append(offset)
 
+        rows = self._db.fetchall(sql, params)
         return [Track(**self._build_track(row)) for row in rows]
 
 
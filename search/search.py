@@ -23,10 +23,13 @@ class SearchExtension(Actor):
     async def on_stop(self):
         logger.info("Stopped")
 
-    async def on_search(self, query):
+    async def on_search(
+        self, query, limit: int | None = None, offset: int | None = None
+    ):
+        """Searches all sources, `limit` and `offset` apply per category."""
         results = await asyncio.gather(
-            self._core.request("radio.search", query=query),
-            self._core.request("local.search", query=query),
+            self._core.request("radio.search", query=query, limit=limit, offset=offset),
+            self._core.request("local.search", query=query, limit=limit, offset=offset),
             return_exceptions=True,
         )
         result_merged = {}
@@ -1,9 +1,9 @@
 import logging
 
 from pathlib import Path
-from core.actor import SourceActor
+from core.actor import SourceActor, blocking
 from core.types import PlaybackControls
-from core.util.metadata import Metadata
+from core.util.metadata import Metadata, image_size
 from core.models import Image, Album, Artist, Track, Source
 
 from .smb_manager import StorageSmbManager
@@ -114,18 +114,19 @@ class StorageExtension(SourceActor):
 
     def _build_track(self, uri: str) -> dict:
         cover_path, tags = self._metadata.extract_cover_and_tags(uri)
-        image_uri = None
+        images = []
 
         if cover_path:
             image_full_path = Path(self._album_images_full_path) / cover_path
             image_web_path = Path(self._album_images_web_path) / cover_path
 
-            if image_full_path.is_file():
-                image_uri = str(image_web_path)
+            size = image_size(image_full_path)
+            if size:
+                images = [Image(uri=str(image_web_path), width=size[0], height=size[1])]
 
         obj: dict = {
             "uri": f"{self._name}:{uri}",
-            "images": [Image(uri=image_uri)] if image_uri else [],
+            "images": images,
             "artists": frozenset(),
             "albums": frozenset(),
             "composers": frozenset(),
@@ -160,11 +161,17 @@ class StorageExtension(SourceActor):
         path = Path(path).as_uri()
         return f"{path}" if id else None
 
-    async def on_lookup_track(self, path: str) -> Track:
+    @blocking
+    def on_lookup_track(self, path: str) -> Track:
         return Track(**self._build_track(path))
 
-    async def on_directory(
-        self, uri: str = None, limit: int | None = None, offset: int | None = None
+    @blocking
+    def on_directory(
+        self,
+        uri: str = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        cursor: str | None = None,
     ):
         if uri == "storage":
             return self._storage.storages_list()
@@ -174,6 +181,7 @@ class StorageExtension(SourceActor):
                 extensions=ALLOWED_FILE_EXT,
                 limit=limit,
                 offset=offset,
+                cursor=cursor,
             )
 
     def on_add_to_library(self, uri: str) -> bool:
@@ -1,11 +1,14 @@
 import psutil
 import pydbus
 import asyncio
+import heapq
 import logging
+import os
 
 from pathlib import Path
 from gi.repository import GLib
-from core.models import RefType, Storage, StorageUsage, Directory, Track, File
+from core.models import RefType, Storage, StorageUsage, Directory, Track, File, Page
+from core.util import encode_cursor, decode_cursor
 from core.util.system import SystemUtil
 
 from .smb_manager import StorageSmbManager
@@ -14,6 +17,7 @@ logger = logging.getLogger(__name__)
 
 INTERNAL_MUSIC_DIR = "Internal"
 INTERNAL_MUSIC_PATH = Path(f"/home/pi/{INTERNAL_MUSIC_DIR}")
+PAGE_SIZE = 100
 
 
 class StorageManager:
@@ -232,48 +236,89 @@ class StorageManager:
         extensions=None,
         limit: int | None = None,
         offset: int | None = None,
-    ) -> dict:
+        cursor: str | None = None,
+    ) -> list | Page:
+        """
+        Lists a directory, directories first then by name. Entries are sorted
+        on names from scandir, only the returned page is stat'ed and resolved.
+        Passing `cursor` (empty for the first page) returns a Page holding the
+        `limit` entries after it.
+        """
         if not uri.startswith(f"{self._name}:"):
             raise ValueError(f"Not a valid storage path: {uri}")
 
         _, path = uri.split(":", 1)
-        p = Path(path)
-        _smb_list_shares = {s.uri for s in self._smb.list_shared_directories()}
-        entries = []
+        after = tuple(decode_cursor(cursor) or ()) if cursor is not None else None
+        if after and not (
+            len(after) == 3
+            and isinstance(after[0], int)
+            and isinstance(after[1], str)
+            and isinstance(after[2], str)
+        ):
+            raise ValueError("Invalid cursor")
+        allowed = None
+        if extensions is not None:
+            allowed = {ext.lower() for ext in extensions}
+        keyed = []
 
         try:
-            for item in p.iterdir():
-                if item.name.startswith("."):
-                    continue
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    is_dir = entry.is_dir()
+                    if (
+                        not is_dir
+                        and allowed is not None
+                        and os.path.splitext(entry.name)[1].lower() not in allowed
+                    ):
+                        continue
+                    key = (int(not is_dir), entry.name.lower(), entry.name)
+                    if after and key <= after:
+                        continue
+                    keyed.append((key, entry))
+        except OSError:
+            return Page() if cursor is not None else []
+
+        if cursor is not None:
+            limit = limit or PAGE_SIZE
+            page = heapq.nsmallest(limit, keyed, key=lambda x: x[0])
+            next_cursor = None
+            if len(page) == limit:
+                next_cursor = encode_cursor(list(page[-1][0]))
+            return Page(items=self._entries(page), next_cursor=next_cursor)
+
+        keyed.sort(key=lambda x: x[0])
+        _offset = offset or 0
+        paginated = keyed[_offset:]
+        if limit is not None:
+            paginated = paginated[:limit]
+        return self._entries(paginated)
+
+    def _entries(self, keyed: list) -> list:
+        _smb_list_shares = {s.uri for s in self._smb.list_shared_directories()}
+        entries = []
+        for (is_file, _, _), entry in keyed:
+            try:
+                item = Path(entry.path)
                 item_uri = f"{self._name}:{str(item.resolve())}"
-                if item.is_dir():
+                if not is_file:
                     entries.append(
                         Directory(
                             uri=item_uri,
-                            name=item.name,
+                            name=entry.name,
                             shared=item_uri in _smb_list_shares,
                         )
                     )
-                elif extensions is None or item.suffix.lower() in [
-                    ext.lower() for ext in extensions
-                ]:
+                else:
                     entries.append(
                         File(
                             uri=item_uri,
-                            name=item.name,
-                            size=item.stat().st_size,
+                            name=entry.name,
+                            size=entry.stat().st_size,
                             ext=item.suffix.lstrip(".").lower()
                         )
                     )
-
-            entries.sort(key=lambda x: (not isinstance(x, Directory), x.name.lower()))
-
-            _offset = offset or 0
-            paginated = entries[_offset:]
-            if limit is not None:
-                paginated = paginated[:limit]
-
-            return paginated
-
-        except Exception:
-            return []
+            except OSError as e:
+                logger.warning(f"Cannot read {entry.path}: {e}")
+        return entries
@@ -61,6 +61,10 @@ class SystemExtension(Actor):
     async def on_event(self, message):
         pass
 
+    def on_api(self) -> dict:
+        """List of every RPC method exposed by the loaded extensions."""
+        return self._core.api()
+
     def on_datetime(self):
         tz = ZoneInfo(self._config["system"]["timezone"])
         now = datetime.now(tz)
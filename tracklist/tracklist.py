@@ -105,7 +105,7 @@ class TracklistExtension(Actor):
         await self.on_next_track()
         self._playback_error = False
         self._core.send(
-            target=["web", "display"],
+            target=["web", "display", "playback"],
             event="tracklist_track_added",
             tl_tracks=_tracks,
         )
@@ -125,7 +125,7 @@ class TracklistExtension(Actor):
         tl_track = next((t for t in self._tl_tracks if t.tlid == tlid), None)
         self._tl_tracks = [t for t in self._tl_tracks if t.tlid != tlid]
         self._core.send(
-            target=["web", "display"],
+            target=["web", "display", "playback"],
             event="tracklist_track_removed",
             tl_track=tl_track,
         )
@@ -162,7 +162,7 @@ class TracklistExtension(Actor):
         self._tl_tracks = new_tl_tracks
         await self.on_next_track()
         self._core.send(
-            target=["web", "display"],
+            target=["web", "display", "playback"],
             event="tracklist_updated",
         )
         self._store_tl_tracks()
@@ -190,7 +190,7 @@ class TracklistExtension(Actor):
             await self._core.request("source.set", uri=None)
 
         self._core.send(
-            target=["web", "display"],
+            target=["web", "display", "playback"],
             event="tracklist_cleared",
         )
         self._store_tl_tracks()
@@ -205,7 +205,7 @@ class TracklistExtension(Actor):
         self._repeat = value
         await self.on_next_track()
         self._core.send(
-            target=["web", "display"],
+            target=["web", "display", "playback"],
             event="options_changed",
             single=self._single,
             repeat=self._repeat,
@@ -222,7 +222,7 @@ class TracklistExtension(Actor):
         self._single = value
         await self.on_next_track()
         self._core.send(
-            target=["web", "display"],
+            target=["web", "display", "playback"],
             event="options_changed",
             single=self._single,
             repeat=self._repeat,
@@ -251,7 +251,7 @@ class TracklistExtension(Actor):
         self._random = value
         await self._init_shuffle()
         self._core.send(
-            target=["web", "display"],
+            target=["web", "display", "playback"],
             event="options_changed",
             single=self._single,
             repeat=self._repeat,
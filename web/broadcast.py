@@ -0,0 +1,140 @@
+import asyncio
+import logging
+
+from core.mailbox import Mailbox, BLOCK
+
+from .codec import JSON, OPCODES
+
+logger = logging.getLogger(__name__)
+
+# Events where a client only needs the latest pending message
+COALESCE_EVENTS = ("track_position_updated", "scan_update", "playback_buffering")
+CLIENT_QUEUE_SIZE = 256
+CLIENT_SEND_TIMEOUT = 5.0
+# Topic of an event is its name up to the first "_", renamed here
+TOPIC_ALIASES = {
+    "track": "playback",
+    "volume": "mixer",
+    "options": "tracklist",
+    "channel": "tuner",
+    "preset": "tuner",
+    "favourite": "collection",
+    "config": "system",
+}
+# Delivered whatever a client subscribed to
+ALWAYS_TOPICS = {"error"}
+
+
+def event_topic(event: str | None) -> str | None:
+    if not event:
+        return None
+    prefix = event.split("_", 1)[0]
+    return TOPIC_ALIASES.get(prefix, prefix)
+
+
+class WebClient:
+    """
+    A connected WebSocket client with its own bounded outbound queue and
+    writer task. Payloads are pre-serialized in the client's `encoding`, JSON
+    as text frames and MessagePack as binary frames, so a broadcast is encoded
+    once per encoding rather than once per client. A client that falls
+    `queue_size` messages behind or stalls a send for `send_timeout` seconds
+    is disconnected instead of holding up the others.
+
+    `topics` is None until the client subscribes, and then only events of
+    those topics are queued for it.
+    """
+
+    def __init__(
+        self,
+        ws,
+        remote: str | None = None,
+        encoding: str = JSON,
+        queue_size: int = CLIENT_QUEUE_SIZE,
+        send_timeout: float = CLIENT_SEND_TIMEOUT,
+    ):
+        self.ws = ws
+        self.remote = remote
+        self.encoding = encoding
+        self._opcode = OPCODES[encoding]
+        self.queue = Mailbox(queue_size, COALESCE_EVENTS, overflow=BLOCK)
+        self.topics = None
+        self.sent = 0
+        self.sent_bytes = 0
+        self.closed = False
+        self._send_timeout = send_timeout
+        self._writer = asyncio.create_task(self._write())
+
+    def wants(self, topic: str | None) -> bool:
+        return (
+            self.topics is None
+            or topic is None
+            or topic in self.topics
+            or topic in ALWAYS_TOPICS
+        )
+
+    def subscribe(self, topics: list[str]) -> list[str]:
+        self.topics = (self.topics or set()) | set(topics)
+        return sorted(self.topics)
+
+    def unsubscribe(self, topics: list[str] | None = None) -> list[str] | None:
+        """Drops `topics`, or every subscription (back to all events) if None."""
+        if topics is None or self.topics is None:
+            self.topics = None
+            return None
+        self.topics -= set(topics)
+        return sorted(self.topics)
+
+    def push(self, payload: bytes, event: str | None = None) -> bool:
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait({"event": event, "payload": payload})
+        except asyncio.QueueFull:
+            logger.warning(f"Client {self.remote} is too slow, disconnecting")
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._writer.cancel()
+
+    async def wait_closed(self):
+        await asyncio.gather(self._writer, return_exceptions=True)
+
+    async def _write(self):
+        try:
+            while True:
+                item = await self.queue.get()
+                await asyncio.wait_for(
+                    self.ws.send_frame(item["payload"], self._opcode),
+                    self._send_timeout,
+                )
+                self.sent += 1
+                self.sent_bytes += len(item["payload"])
+        except asyncio.CancelledError:
+            pass
+        except asyncio.TimeoutError:
+            logger.warning(f"Send to client {self.remote} timed out, disconnecting")
+        except Exception as e:
+            logger.error(f"Failed to send to client {self.remote}: {e}")
+        finally:
+            self.closed = True
+            if not self.ws.closed:
+                try:
+                    await self.ws.close()
+                except Exception:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "remote": self.remote,
+            "encoding": self.encoding,
+            "topics": sorted(self.topics) if self.topics is not None else None,
+            "compress": bool(self.ws.compress),
+            "sent": self.sent,
+            "sent_bytes": self.sent_bytes,
+            **self.queue.stats(),
+        }
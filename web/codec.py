@@ -0,0 +1,130 @@
+import json
+import time
+import zlib
+
+from typing import Any
+from aiohttp import WSMsgType
+from core.util import (
+    ResponseTypeAdapterWs,
+    SuccessResponse,
+    SuccessResponseAdapter,
+    ErrorResponse,
+    ErrorResponseAdapter,
+    ErrorDetails,
+    handle_json_ws,
+    jsonrpc_result,
+    jsonrpc_error,
+)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "json"
+MSGPACK = "msgpack"
+# WebSocket subprotocols a client may ask for, plain JSON needs none
+SUBPROTOCOLS = (MSGPACK,) if msgpack else ()
+OPCODES = {JSON: WSMsgType.TEXT, MSGPACK: WSMsgType.BINARY}
+
+
+# Prefix of the last payload deflated for the size estimate, keeps the cost
+# of recording a multi-MB reply bounded
+DEFLATE_SAMPLE_BYTES = 16 * 1024
+
+
+def deflated_size(payload: bytes) -> int:
+    """Size after permessage-deflate, estimated from a prefix of `payload`."""
+    sample = payload[:DEFLATE_SAMPLE_BYTES]
+    if not sample:
+        return 0
+    deflate = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    deflated = len(deflate.compress(sample) + deflate.flush(zlib.Z_SYNC_FLUSH))
+    return deflated * len(payload) // len(sample)
+
+
+class CodecStats:
+    """Serialization timings and sizes per encoding, for web.diagnostics."""
+
+    def __init__(self):
+        self.encodings = {}
+
+    def record(self, encoding: str, seconds: float, payload: bytes):
+        stats = self.encodings.get(encoding)
+        if stats is None:
+            stats = self.encodings[encoding] = {
+                "messages": 0,
+                "bytes": 0,
+                "seconds": 0.0,
+            }
+        stats["messages"] += 1
+        stats["bytes"] += len(payload)
+        stats["seconds"] += seconds
+        # Sizes only, the payload itself is not kept alive
+        stats["last_bytes"] = len(payload)
+        stats["last_deflated_bytes"] = deflated_size(payload)
+
+    def snapshot(self) -> dict:
+        return {
+            encoding: {
+                "messages": stats["messages"],
+                "bytes": stats["bytes"],
+                "seconds": stats["seconds"],
+                "avg_bytes": stats["bytes"] / stats["messages"],
+                "avg_ms": stats["seconds"] * 1000 / stats["messages"],
+                "last_bytes": stats["last_bytes"],
+                "last_deflated_bytes": stats["last_deflated_bytes"],
+            }
+            for encoding, stats in self.encodings.items()
+        }
+
+
+stats = CodecStats()
+
+
+def _packb(message: Any, adapter=ResponseTypeAdapterWs) -> bytes:
+    return msgpack.packb(adapter.dump_python(message, mode="json", by_alias=True))
+
+
+def encode(message: Any, encoding: str = JSON) -> bytes:
+    start = time.perf_counter()
+    if encoding == MSGPACK:
+        payload = _packb(message)
+    else:
+        payload = handle_json_ws(message)
+    stats.record(encoding, time.perf_counter() - start, payload)
+    return payload
+
+
+def decode(data: bytes | str, encoding: str = JSON) -> Any:
+    if encoding == MSGPACK:
+        return msgpack.unpackb(data)
+    return json.loads(data)
+
+
+def encode_result(result: Any, req_id, encoding: str = JSON) -> bytes:
+    start = time.perf_counter()
+    if encoding == MSGPACK:
+        response = SuccessResponse.model_construct(id=req_id, result=result)
+        payload = _packb(response, SuccessResponseAdapter)
+    else:
+        payload = jsonrpc_result(result, req_id)
+    stats.record(encoding, time.perf_counter() - start, payload)
+    return payload
+
+
+def encode_error(
+    message: str, req_id=None, code: int = -32603, encoding: str = JSON
+) -> bytes:
+    if encoding == MSGPACK:
+        error = ErrorDetails(code=code, message=message)
+        response = ErrorResponse.model_construct(id=req_id, error=error)
+        return _packb(response, ErrorResponseAdapter)
+    return jsonrpc_error(message, req_id, code)
+
+
+def join(parts: list[bytes], encoding: str = JSON) -> bytes:
+    """Encoded responses of a batch as one array."""
+    if encoding == MSGPACK:
+        return msgpack.Packer().pack_array_header(len(parts)) + b"".join(parts)
+    return b"[" + b",".join(parts) + b"]"
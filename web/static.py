@@ -0,0 +1,177 @@
+import asyncio
+import aiofiles
+import hashlib
+import logging
+import mimetypes
+import os
+import pathlib
+import stat
+
+from collections import OrderedDict, namedtuple
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+STATIC_CACHE_BYTES = 32 * 1024 * 1024
+# Larger files are not kept in memory but sent with sendfile or streamed
+STATIC_CACHE_MAX_FILE = 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+# Asset and image names are not content-hashed, so browsers revalidate
+# against the ETag and get a body-less 304 when nothing changed
+NO_CACHE = "no-cache"
+IMAGE_CACHE_CONTROL = "public, max-age=3600"
+
+CachedFile = namedtuple("CachedFile", ["stamp", "body", "etag"])
+
+
+def file_etag(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=12).hexdigest()
+
+
+class FileCache:
+    """
+    LRU of small static files keyed by path. An entry is only served while
+    the file's (mtime, size) stamp is unchanged.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = STATIC_CACHE_BYTES,
+        max_file: int = STATIC_CACHE_MAX_FILE,
+    ):
+        self.max_bytes = max_bytes
+        self.max_file = max_file
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, stamp: tuple) -> CachedFile | None:
+        entry = self._entries.get(path)
+        if entry is None or entry.stamp != stamp:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(path)
+        self.hits += 1
+        return entry
+
+    def put(self, path: str, stamp: tuple, body: bytes) -> CachedFile:
+        entry = CachedFile(stamp, body, file_etag(body))
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self.size -= len(old.body)
+        if len(body) > self.max_file:
+            return entry
+        self._entries[path] = entry
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class StaticFiles:
+    """
+    Serves static files with ETag and Cache-Control headers and answers
+    conditional requests with 304. Small files come from the in-memory
+    `cache`, larger ones go through sendfile unless `use_sendfile` is off
+    (gbulb), in which case they are streamed in chunks.
+    """
+
+    def __init__(self, use_sendfile: bool = True, cache: FileCache | None = None):
+        self.use_sendfile = use_sendfile
+        self.cache = cache or FileCache()
+
+    @staticmethod
+    def resolve(directory: pathlib.Path, filename: str) -> pathlib.Path:
+        """Joins `filename` to `directory`, refusing paths that escape it."""
+        root = os.path.normpath(directory)
+        path = os.path.normpath(os.path.join(root, filename))
+        if not path.startswith(root + os.sep):
+            raise web.HTTPNotFound()
+        return pathlib.Path(path)
+
+    @staticmethod
+    def content_type(path: pathlib.Path, mime_map: dict | None = None) -> str:
+        ext = path.suffix.lower()
+        if mime_map and ext in mime_map:
+            return mime_map[ext]
+        return mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+
+    async def serve(
+        self,
+        request,
+        path: pathlib.Path,
+        content_type: str,
+        cache_control: str = NO_CACHE,
+        headers: dict | None = None,
+    ):
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise web.HTTPNotFound()
+        if not stat.S_ISREG(st.st_mode):
+            raise web.HTTPNotFound()
+
+        headers = {**(headers or {}), "Cache-Control": cache_control}
+        if st.st_size > self.cache.max_file:
+            if self.use_sendfile:
+                # aiohttp handles conditional requests for these itself
+                headers["Content-Type"] = content_type
+                return web.FileResponse(path, headers=headers)
+            # Same validator as aiohttp's FileResponse, without hashing the file
+            etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+            headers["ETag"] = f'"{etag}"'
+            if self._not_modified(request, etag):
+                return web.Response(status=304, headers=headers)
+            return await self.stream(request, path, content_type, headers)
+
+        key = str(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self.cache.get(key, stamp)
+        if entry is None:
+            body = await asyncio.to_thread(path.read_bytes)
+            entry = self.cache.put(key, stamp, body)
+
+        headers["ETag"] = f'"{entry.etag}"'
+        if self._not_modified(request, entry.etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(body=entry.body, content_type=content_type, headers=headers)
+
+    def _not_modified(self, request, etag: str) -> bool:
+        try:
+            tags = request.if_none_match
+        except ValueError:
+            return False
+        if not tags:
+            return False
+        return any(tag.value in (etag, "*") for tag in tags)
+
+    async def stream(self, request, path: pathlib.Path, content_type: str, headers: dict):
+        """Streams a file in chunks, for event loops without sendfile (gbulb)."""
+        resp = web.StreamResponse(headers=headers)
+        resp.content_type = content_type
+        resp.content_length = os.path.getsize(path)
+        await resp.prepare(request)
+
+        async with aiofiles.open(path, "rb") as f:
+            chunk = await f.read(STREAM_CHUNK_SIZE)
+            while chunk:
+                await resp.write(chunk)
+                chunk = await f.read(STREAM_CHUNK_SIZE)
+
+        await resp.write_eof()
+        return resp
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import pathlib
+
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image as PILImage
+
+logger = logging.getLogger(__name__)
+
+# Requested sizes are rounded up to one of these, so a grid asking for
+# arbitrary sizes cannot fill the cache with near-duplicates
+THUMBNAIL_SIZES = (96, 192, 384, 768)
+# Outside the source tree, `thumbnail_cache_dir` in the web config overrides it
+THUMBNAIL_CACHE_DIR = (
+    pathlib.Path(os.environ.get("XDG_CACHE_HOME") or "~/.cache").expanduser()
+    / "berryaudio"
+    / "thumbnails"
+)
+THUMBNAIL_CACHE_BYTES = 128 * 1024 * 1024
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_QUALITY = 80
+
+Format = namedtuple("Format", ["pil", "suffix", "content_type"])
+FORMATS = {
+    "webp": Format("WEBP", ".webp", "image/webp"),
+    "jpeg": Format("JPEG", ".jpg", "image/jpeg"),
+}
+
+
+def render_thumbnail(src: str, dst: str, size: int, fmt: str) -> int:
+    """Runs inside a pool worker, writes the thumbnail and returns its size in bytes."""
+    with PILImage.open(src) as im:
+        # Lets the JPEG decoder scale down while decoding
+        im.draft("RGB", (size, size))
+        im.thumbnail((size, size), PILImage.LANCZOS)
+        if fmt == "jpeg" and im.mode != "RGB":
+            im = im.convert("RGB")
+        elif im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        tmp = f"{dst}.{os.getpid()}.tmp"
+        im.save(tmp, FORMATS[fmt].pil, quality=THUMBNAIL_QUALITY)
+    os.replace(tmp, dst)
+    return os.path.getsize(dst)
+
+
+class ThumbnailCache:
+    """
+    Thumbnails keyed by (image, size, format), rendered in a process pool and
+    kept on disk up to `max_bytes`, least recently used evicted first. The
+    key includes the source's mtime and size, a changed image gets new
+    thumbnails and the stale ones age out.
+    """
+
+    def __init__(
+        self,
+        cache_dir: pathlib.Path = THUMBNAIL_CACHE_DIR,
+        max_bytes: int = THUMBNAIL_CACHE_BYTES,
+        workers: int = THUMBNAIL_WORKERS,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._workers = workers
+        self._pool = None
+        self._entries = OrderedDict()
+        self._pending = {}
+        self.size = 0
+        self.hits = 0
+        self.rendered = 0
+
+    def load(self):
+        """Indexes thumbnails left by a previous run, oldest first."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        found = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp"):
+                    os.remove(entry.path)
+                elif entry.is_file():
+                    st = entry.stat()
+                    found.append((st.st_mtime, entry.name, st.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self.size += size
+        self._evict()
+        logger.info(f"{len(self._entries)} cached thumbnails ({self.size} bytes)")
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def pick_size(requested: int) -> int:
+        for size in THUMBNAIL_SIZES:
+            if size >= requested:
+                return size
+        return THUMBNAIL_SIZES[-1]
+
+    async def get(self, src: pathlib.Path, size: int, fmt: str) -> pathlib.Path:
+        """Path of the thumbnail of `src`, rendering it first if needed."""
+        st = os.stat(src)
+        size = self.pick_size(size)
+        key = f"{src}:{st.st_mtime_ns}:{st.st_size}:{size}"
+        name = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+        name += FORMATS[fmt].suffix
+        path = self.cache_dir / name
+
+        if name in self._entries:
+            if path.is_file():
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return path
+            # Evicted by a concurrent render or removed from outside
+            self.discard(name)
+
+        # Concurrent requests for the same thumbnail share one render, and a
+        # client going away does not cancel it for the others
+        task = self._pending.get(name)
+        if task is None:
+            task = self._pending[name] = asyncio.create_task(
+                self._render(src, path, size, fmt)
+            )
+        await asyncio.shield(task)
+        return path
+
+    async def _render(self, src: pathlib.Path, path: pathlib.Path, size: int, fmt: str):
+        if self._pool is None:
+            # Forking would copy locks held by the GLib and GStreamer threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        # The directory may have been removed from outside since load()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        try:
+            nbytes = await loop.run_in_executor(
+                self._pool, render_thumbnail, str(src), str(path), size, fmt
+            )
+        finally:
+            self._pending.pop(path.name, None)
+        self._entries[path.name] = nbytes
+        self.size += nbytes
+        self.rendered += 1
+        self._evict()
+
+    def discard(self, name: str):
+        """Forgets a thumbnail whose file is gone, the next `get` renders it again."""
+        nbytes = self._entries.pop(name, None)
+        if nbytes is not None:
+            self.size -= nbytes
+
+    def _evict(self):
+        while self.size > self.max_bytes and len(self._entries) > 1:
+            name, nbytes = self._entries.popitem(last=False)
+            self.size -= nbytes
+            try:
+                os.remove(self.cache_dir / name)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "rendered": self.rendered,
+            "pending": len(self._pending),
+        }
@@ -1,15 +1,21 @@
 import pathlib
 import asyncio
-import json
 import logging
-import aiofiles
 
 from fractions import Fraction
 from aiohttp import web, WSMsgType
 from core.actor import Actor
+from core.mailbox import DROP_OLDEST
 from main import USE_GBULB
 from core.actor import Actor
-from core.util import handle_json, handle_json_ws
+from . import codec
+from .static import StaticFiles, IMAGE_CACHE_CONTROL, NO_CACHE
+from .thumbnails import (
+    ThumbnailCache,
+    FORMATS as THUMBNAIL_FORMATS,
+    THUMBNAIL_CACHE_DIR,
+)
+from .broadcast import WebClient, COALESCE_EVENTS, event_topic
 
 logging.getLogger("aiohttp.access").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
@@ -27,8 +33,32 @@ IMAGE_MIME_MAP = {
     ".jpg": "image/jpeg",
     ".jpeg": "image/jpeg",
 }
+JSONRPC_MAX_BATCH = 50
+# Largest incoming WebSocket message, requests are small even as a full batch
+WS_MAX_MSG_SIZE = 256 * 1024
+# Handled per connection, `topics` are event topics (see broadcast.event_topic)
+CLIENT_METHODS = ("web.subscribe", "web.unsubscribe", "web.subscriptions")
+# Read-only methods, run concurrently inside a batch. Anything else runs on
+# its own, in request order, so state changes keep their sequence.
+JSONRPC_READ_METHODS = {
+    "directory",
+    "search",
+    "lookup_track",
+    "devices",
+    "servers",
+    "list",
+    "info",
+    "scan_progress",
+    "snapshot",
+    "api",
+}
 
 class WebExtension(Actor):
+    # Events are fanned out to clients, a backlog is not worth keeping
+    mailbox_size = 1000
+    mailbox_overflow = DROP_OLDEST
+    coalesce = COALESCE_EVENTS
+
     def __init__(self, name, core, db, config):
         super().__init__()
         self._name = name
@@ -37,52 +67,83 @@ class WebExtension(Actor):
         self._config = config
         self.ws = None
         self._server_stop = asyncio.Event()
+        # gbulb's loop has no sendfile support
+        self._static = StaticFiles(use_sendfile=not USE_GBULB)
+        cache_dir = self._config.get(self._name, {}).get("thumbnail_cache_dir")
+        self._thumbnails = ThumbnailCache(
+            pathlib.Path(cache_dir).expanduser() if cache_dir else THUMBNAIL_CACHE_DIR
+        )
 
     async def on_start(self):
         logger.info("Started")
-        self._clients = set()
+        self._clients = {}
+        await asyncio.to_thread(self._thumbnails.load)
         self._server_task = asyncio.create_task(self.run_server())
 
-    async def stream_file(self, request, file_path: pathlib.Path, content_type: str):
-        """Stream a file manually to avoid sendfile (compatible with gbulb)."""
-        resp = web.StreamResponse()
-        resp.content_type = content_type
-        await resp.prepare(request)
-
-        async with aiofiles.open(file_path, "rb") as f:
-            chunk = await f.read(64 * 1024)  # 64 KB chunks
-            while chunk:
-                await resp.write(chunk)
-                chunk = await f.read(64 * 1024)
-
-        await resp.write_eof()
-        return resp
-
     def _add_static_route(
-        self, prefix: str, directory: pathlib.Path, mime_map: dict = None
+        self,
+        prefix: str,
+        directory: pathlib.Path,
+        mime_map: dict = None,
+        cache_control: str = NO_CACHE,
+        thumbnails: bool = False,
     ):
-        """Add static file serving for aiohttp, handling USE_GBULB mode."""
-        if USE_GBULB:
+        """
+        Serve `directory` under `prefix` with ETag and Cache-Control headers.
+        With `thumbnails`, a `?size=` query serves a resized copy instead.
+        """
+
+        async def handler(request):
+            file_path = self._static.resolve(directory, request.match_info["filename"])
+            if thumbnails and "size" in request.query:
+                return await self._serve_thumbnail(request, file_path, cache_control)
+            content_type = self._static.content_type(file_path, mime_map)
+            return await self._static.serve(
+                request, file_path, content_type, cache_control
+            )
 
-            async def handler(request):
-                filename = request.match_info["filename"]
-                file_path = directory / filename
-                if not file_path.exists():
-                    raise web.HTTPNotFound()
-                ext = file_path.suffix.lower()
-                content_type = (
-                    mime_map.get(ext, "application/octet-stream")
-                    if mime_map
-                    else "application/octet-stream"
+        self._app.router.add_get(f"{prefix}{{filename:.*}}", handler)
+
+    async def _serve_thumbnail(self, request, file_path: pathlib.Path, cache_control):
+        try:
+            size = int(request.query["size"])
+        except ValueError:
+            raise web.HTTPBadRequest(text="size must be an integer")
+        if size <= 0:
+            raise web.HTTPBadRequest(text="size must be positive")
+
+        fmt = request.query.get("format")
+        if fmt is None:
+            fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpeg"
+        if fmt not in THUMBNAIL_FORMATS:
+            raise web.HTTPBadRequest(text=f"Unsupported format: {fmt}")
+
+        for attempt in range(2):
+            try:
+                thumb_path = await self._thumbnails.get(file_path, size, fmt)
+            except FileNotFoundError:
+                raise web.HTTPNotFound()
+            except Exception as e:
+                logger.warning(f"Thumbnail failed for {file_path}: {e}")
+                return await self._static.serve(
+                    request,
+                    file_path,
+                    self._static.content_type(file_path, IMAGE_MIME_MAP),
+                    cache_control,
                 )
-                return await self.stream_file(
-                    request, file_path, content_type=content_type
+            try:
+                return await self._static.serve(
+                    request,
+                    thumb_path,
+                    THUMBNAIL_FORMATS[fmt].content_type,
+                    cache_control,
+                    headers={"Vary": "Accept"},
                 )
-
-            self._app.router.add_get(f"{prefix}{{filename:.*}}", handler)
-        else:
-            self._app.router.add_static(
-                prefix, path=directory, name=prefix.strip("/"))
+            except (web.HTTPNotFound, FileNotFoundError):
+                # Evicted while being read, render it again once
+                self._thumbnails.discard(thumb_path.name)
+                if attempt:
+                    raise web.HTTPNotFound()
 
     async def run_server(self):
         host = "0.0.0.0"
@@ -94,19 +155,17 @@ class WebExtension(Actor):
 
         self._app.router.add_get("/ws", self.websocket_handler)
         self._app.router.add_post("/rpc", self.webrpc_handler)
+        self._app.router.add_get("/metrics", self.metrics_handler)
 
         async def index_handler(request):
-            if USE_GBULB:
-                return await self.stream_file(
-                    request, www_dir / "index.html", content_type="text/html"
-                )
-            else:
-                return web.FileResponse(
-                    www_dir / "index.html", headers={"Content-Type": "text/html"}
-                )
+            return await self._static.serve(
+                request, www_dir / "index.html", content_type="text/html"
+            )
 
         self._add_static_route("/assets/", www_dir / "assets", ASSET_MIME_MAP)
-        self._add_static_route("/images/", images_dir, IMAGE_MIME_MAP)
+        self._add_static_route(
+            "/images/", images_dir, IMAGE_MIME_MAP, IMAGE_CACHE_CONTROL, thumbnails=True
+        )
         self._app.router.add_get("/{tail:.*}", index_handler)
 
         runner = web.AppRunner(self._app)
@@ -118,111 +177,246 @@ class WebExtension(Actor):
         await self._server_stop.wait()
         await runner.cleanup()
 
-    async def safe_send_to(self, ws, message: dict):
-        """Send to a specific client only."""
+    async def safe_send_to(self, ws, message: dict | bytes):
+        """
+        Send to a specific client only, `message` may be pre-serialized in
+        the client's encoding.
+        """
+        client = self._clients.get(ws)
+        if client is None:
+            return
         try:
-            if ws and not ws.closed:
-                payload = handle_json_ws(message)
-                if isinstance(payload, bytes):
-                    payload = payload.decode("utf-8")
-                await ws.send_str(payload)
+            if not isinstance(message, bytes):
+                message = codec.encode(message, client.encoding)
+            client.push(message)
         except Exception as e:
             logger.error(f"Failed to send to client: {e}")
-            self._clients.discard(ws)
 
     async def safe_send(self, message: dict):
+        """
+        Broadcast to the clients subscribed to the event's topic, serialized
+        once per encoding and only if some client wants it.
+        """
         if not self._clients:
             return
-        payload = handle_json_ws(message)
-        if isinstance(payload, bytes):
-            payload = payload.decode("utf-8")
-        for client in list(self._clients):
-            try:
-                if not client.closed:
-                    await client.send_str(payload)
-            except Exception as e:
-                logger.error(f"Failed to send to client: {e}")
-                self._clients.discard(client)
+        payloads = {}
+        event = message.get("event")
+        topic = event_topic(event)
+        for client in list(self._clients.values()):
+            if not client.wants(topic):
+                continue
+            payload = payloads.get(client.encoding)
+            if payload is None:
+                payload = payloads[client.encoding] = codec.encode(
+                    message, client.encoding
+                )
+            client.push(payload, event)
+
+    def on_clients(self) -> list[dict]:
+        return [client.stats() for client in self._clients.values()]
+
+    def on_diagnostics(self) -> dict:
+        """WebSocket transport stats: encodings, sizes and serialization time."""
+        return {
+            "subprotocols": [codec.JSON, *codec.SUBPROTOCOLS],
+            "encodings": codec.stats.snapshot(),
+            "clients": self.on_clients(),
+            "static_cache": self._static.cache.stats(),
+            "thumbnails": self._thumbnails.stats(),
+        }
+
+    async def metrics_handler(self, request):
+        """Prometheus text exposition, served when the metrics extension is loaded."""
+        text = await self._core.request("metrics.prometheus")
+        if text is None:
+            raise web.HTTPNotFound()
+        return web.Response(
+            body=text.encode("utf-8"),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
 
     async def webrpc_handler(self, request):
         try:
             data = await request.json()
             response = await self.handle_jsonrpc(None, data, send=False)
         except Exception as e:
-            response = {
-                "jsonrpc": "2.0",
-                "error": {"code": -32603, "message": str(e)},
-                "id": None,
-            }
-        return web.json_response(response)
+            response = codec.encode_error(str(e))
+        if response is None:
+            # Batch of notifications only
+            return web.Response(status=204)
+        return web.Response(body=response, content_type="application/json")
 
     async def websocket_handler(self, request):
-        ws = web.WebSocketResponse()
+        # Deflating every small event costs more CPU than it saves on a LAN,
+        # `ws_compress: false` turns permessage-deflate off
+        ws = web.WebSocketResponse(
+            compress=bool(self._config.get(self._name, {}).get("ws_compress", True)),
+            max_msg_size=WS_MAX_MSG_SIZE,
+            protocols=codec.SUBPROTOCOLS,
+        )
         await ws.prepare(request)
-        self._clients.add(ws)
-        logger.info(f"Client connected: {request.remote}")
+        encoding = codec.JSON
+        if ws.ws_protocol in codec.SUBPROTOCOLS:
+            encoding = ws.ws_protocol
+        client = WebClient(ws, request.remote, encoding)
+        self._clients[ws] = client
+        logger.info(
+            f"Client connected: {request.remote} ({encoding}, compress={ws.compress})"
+        )
         try:
             async for msg in ws:
-                if msg.type == WSMsgType.TEXT:
+                if msg.type in (WSMsgType.TEXT, WSMsgType.BINARY):
+                    if msg.type != codec.OPCODES[encoding]:
+                        kind = "text" if msg.type == WSMsgType.TEXT else "binary"
+                        await self.safe_send_to(
+                            ws,
+                            codec.encode_error(
+                                f"Invalid Request: {kind} frame on a {encoding} "
+                                f"connection",
+                                code=-32600,
+                                encoding=encoding,
+                            ),
+                        )
+                        continue
                     await self.handle_jsonrpc(ws, msg.data)
                 elif msg.type == WSMsgType.ERROR:
                     logger.error(f"WS error: {ws.exception()}")
         finally:
-            self._clients.discard(ws)
+            self._clients.pop(ws, None)
+            client.close()
             logger.info(f"Client disconnected: {request.remote}")
         return ws
     
 
-    async def handle_jsonrpc(self, ws, data, send=True):
+    async def handle_jsonrpc(self, ws, data, send=True) -> bytes | None:
+        """
+        Runs a JSON-RPC request or batch and returns the serialized response.
+        The result is encoded once, the same bytes serve /rpc and /ws.
+        """
+        client = self._clients.get(ws) if ws else None
+        encoding = client.encoding if client else codec.JSON
         try:
-            request_obj = json.loads(data) if isinstance(data, str) else data
+            if isinstance(data, (str, bytes)):
+                request_obj = codec.decode(data, encoding)
+            else:
+                request_obj = data
+        except Exception as e:
+            response = codec.encode_error(str(e) or "Parse error", encoding=encoding)
+        else:
+            if isinstance(request_obj, list):
+                response = await self._handle_batch(request_obj, encoding, client)
+            else:
+                response = await self._handle_request(request_obj, encoding, client)
+
+        if response is not None and ws and send:
+            await self.safe_send_to(ws, response)
+        return response
+
+    async def _handle_batch(
+        self, entries: list, encoding: str, client: WebClient | None = None
+    ) -> bytes | None:
+        """
+        Runs a JSON-RPC batch and returns one array for all of it. Adjacent
+        read-only calls run concurrently. Entries without an id are
+        notifications and get no response.
+        """
+        if not entries:
+            return codec.encode_error(
+                "Invalid Request: empty batch", code=-32600, encoding=encoding
+            )
+        if len(entries) > JSONRPC_MAX_BATCH:
+            return codec.encode_error(
+                f"Invalid Request: batch exceeds {JSONRPC_MAX_BATCH} calls",
+                code=-32600,
+                encoding=encoding,
+            )
+
+        responses = []
+        group = []
+        for entry in entries:
+            if self._is_read_only(entry):
+                group.append(self._handle_request(entry, encoding, client))
+                continue
+            if group:
+                responses += await asyncio.gather(*group)
+                group = []
+            responses.append(await self._handle_request(entry, encoding, client))
+        if group:
+            responses += await asyncio.gather(*group)
+
+        parts = [
+            response
+            for entry, response in zip(entries, responses)
+            if not isinstance(entry, dict) or "id" in entry
+        ]
+        if not parts:
+            return None
+        return codec.join(parts, encoding)
+
+    def _client_request(self, client: WebClient | None, method: str, params: dict):
+        """Methods acting on the calling WebSocket client itself."""
+        if client is None:
+            raise ValueError(f"{method} is only available over /ws")
+        topics = params.get("topics")
+        if topics is not None and not isinstance(topics, list):
+            raise ValueError("topics must be a list of topic names")
+        if method == "web.subscribe":
+            if not topics:
+                raise ValueError("topics must be a list of topic names")
+            return client.subscribe(topics)
+        if method == "web.unsubscribe":
+            return client.unsubscribe(topics)
+        return sorted(client.topics) if client.topics is not None else None
+
+    def _is_read_only(self, entry) -> bool:
+        method = entry.get("method") if isinstance(entry, dict) else None
+        if not isinstance(method, str) or "." not in method:
+            return False
+        name = method.split(".", 1)[1]
+        return name.startswith("get_") or name in JSONRPC_READ_METHODS
+
+    async def _handle_request(
+        self,
+        request_obj,
+        encoding: str = codec.JSON,
+        client: WebClient | None = None,
+    ) -> bytes:
+        req_id = None
+        try:
+            if not isinstance(request_obj, dict):
+                raise ValueError("Invalid JSON-RPC 2.0 request")
+            req_id = request_obj.get("id")
             if request_obj.get("jsonrpc") != "2.0":
                 raise ValueError("Invalid JSON-RPC 2.0 request")
 
             method = request_obj.get("method")
             params = request_obj.get("params", None)
-            req_id = request_obj.get("id")
 
-            if params is None:
+            if params is not None and not isinstance(params, dict):
+                raise ValueError("Params must be a JSON object (dict) or null")
+
+            if method in CLIENT_METHODS:
+                result = self._client_request(client, method, params or {})
+            elif params is None:
                 result = await self._core.request(method)
-            elif isinstance(params, dict):
-                result = await self._core.request(method, **params)
             else:
-                raise ValueError("Params must be a JSON object (dict) or null")
+                result = await self._core.request(method, **params)
 
-            response = json.loads(
-                handle_json({"jsonrpc": "2.0", "result": result, "id": req_id})
-            )
+            return codec.encode_result(result, req_id, encoding)
 
         except Exception as e:
-            response = json.loads(
-                handle_json(
-                    {
-                        "jsonrpc": "2.0",
-                        "error": {"code": -32603, "message": str(e)},
-                        "id": (
-                            request_obj.get(
-                                "id") if "request_obj" in locals() else None
-                        ),
-                    }
-                )
-            )
-
-        if ws and send:
-            await self.safe_send_to(ws, response)
-        return response
+            return codec.encode_error(str(e), req_id, encoding=encoding)
 
     async def on_event(self, message):
         logger.debug(f"Sending message: {message}")
         await self.safe_send(message)
 
     async def on_stop(self):
+        self._thumbnails.close()
         if hasattr(self, "_clients"):
-            for ws in list(self._clients):
-                try:
-                    await ws.close()
-                except Exception:
-                    pass
+            for client in list(self._clients.values()):
+                client.close()
+                await client.wait_closed()
             self._clients.clear()
 
         self.running = False